@@ -0,0 +1,614 @@
+# benchmarks/pipeline_benchmark.py
+"""End-to-end benchmark for the sensor pipeline.
+
+Drives simulator -> Redis queue -> DataProcessor -> MySQL/MongoDB, plus the
+cloud API ingest endpoint, and reports throughput, per-stage latency
+percentiles and memory usage as JSON.
+
+By default every dependency is replaced by an in-process stand-in
+(fakeredis, SQLite, mongomock) so the benchmark runs anywhere. With
+``--mode real`` the data processor connects to the services configured by
+the same environment variables the containers use, but writes to separate
+databases (``--bench-database``, default ``iot_agriculture_bench``) and a
+separate Redis list so production data is never touched. The cloud API
+suite only runs in stub mode.
+
+    python benchmarks/pipeline_benchmark.py --sensors 50 --readings 5000
+    python benchmarks/pipeline_benchmark.py --compare benchmarks/results/<previous>.json
+"""
+import argparse
+import contextlib
+import importlib.util
+import json
+import logging
+import os
+import platform
+import re
+import resource
+import sqlite3
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIMULATOR_DIR = os.path.join(ROOT, 'local-services', 'sensor-simulator')
+PROCESSOR_DIR = os.path.join(ROOT, 'local-services', 'data-processor')
+CLOUD_API_DIR = os.path.join(ROOT, 'cloud-infrastructure', 'api-server')
+RESULTS_DIR = os.path.join(ROOT, 'benchmarks', 'results')
+
+MIGRATIONS_DIR = os.path.join(ROOT, 'database', 'mysql', 'migrations')
+
+# The cloud API's alerts table is not part of the migrations
+SQLITE_ALERTS_TABLE = """
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    alert_type TEXT NOT NULL,
+    sensor_id TEXT NOT NULL,
+    value REAL NOT NULL,
+    severity TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    acknowledged INTEGER DEFAULT 0
+);
+"""
+
+
+def sqlite_schema() -> str:
+    """Translate the CREATE statements of the MySQL migrations to SQLite"""
+    statements = []
+    for name in sorted(f for f in os.listdir(MIGRATIONS_DIR) if f.endswith('.sql')):
+        with open(os.path.join(MIGRATIONS_DIR, name)) as f:
+            sql = '\n'.join(line for line in f.read().splitlines() if not line.lstrip().startswith('--'))
+        for statement in re.split(r';\s*$', sql, flags=re.M):
+            statement = statement.strip()
+            if statement.startswith('CREATE TABLE'):
+                statements.extend(sqlite_create_table(statement))
+            elif statement.startswith('CREATE OR REPLACE VIEW'):
+                statements.append(statement.replace('CREATE OR REPLACE VIEW', 'CREATE VIEW IF NOT EXISTS', 1))
+    return ';\n'.join(statements) + ';\n' + SQLITE_ALERTS_TABLE
+
+
+def sqlite_create_table(statement: str) -> List[str]:
+    table = re.match(r'CREATE TABLE IF NOT EXISTS (\w+)', statement).group(1)
+    statement = re.sub(r'\w*INT AUTO_INCREMENT PRIMARY KEY', 'INTEGER PRIMARY KEY AUTOINCREMENT', statement)
+    statement = re.sub(r'\s+ON UPDATE CURRENT_TIMESTAMP(\(\d\))?', '', statement)
+    statement = re.sub(r'(CURRENT_TIMESTAMP|TIMESTAMP)\(\d\)', r'\1', statement)
+    # Inline INDEX(...) clauses become separate CREATE INDEX statements
+    indexes = re.findall(r',\s*INDEX\((\w+)\)', statement)
+    statement = re.sub(r',\s*INDEX\((\w+)\)', '', statement)
+    return [statement] + [
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_{column} ON {table}({column})" for column in indexes
+    ]
+
+
+def load_module(name: str, directory: str):
+    """Import a service's app.py under a unique module name"""
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+    spec = importlib.util.spec_from_file_location(name, os.path.join(directory, 'app.py'))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+# ---------------------------------------------------------------------------
+# Stand-ins
+# ---------------------------------------------------------------------------
+
+class SQLiteCursor:
+    """Minimal mysql.connector cursor on top of sqlite3 (%s placeholders, dictionary rows)"""
+
+    def __init__(self, conn: sqlite3.Connection, dictionary: bool = False):
+        self.cursor = conn.cursor()
+        self.dictionary = dictionary
+
+    def execute(self, query: str, params=()):
+        import mysql.connector
+        from mysql.connector import errorcode
+        try:
+            self.cursor.execute(re.sub(r'%s', '?', query), tuple(params or ()))
+        except sqlite3.IntegrityError as e:
+            # Same errno as MySQL: duplicate key vs. foreign key failure
+            errno = errorcode.ER_DUP_ENTRY if 'UNIQUE' in str(e) else errorcode.ER_NO_REFERENCED_ROW_2
+            raise mysql.connector.IntegrityError(msg=str(e), errno=errno) from e
+
+    def executemany(self, query: str, seq_of_params):
+        self.cursor.executemany(re.sub(r'%s', '?', query), [tuple(p) for p in seq_of_params])
+
+    def fetchone(self):
+        row = self.cursor.fetchone()
+        return self.to_dict(row) if row is not None else None
+
+    def fetchall(self):
+        return [self.to_dict(row) for row in self.cursor.fetchall()]
+
+    def to_dict(self, row):
+        if not self.dictionary:
+            return row
+        return {column[0]: value for column, value in zip(self.cursor.description, row)}
+
+    @property
+    def lastrowid(self):
+        return self.cursor.lastrowid
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    def close(self):
+        self.cursor.close()
+
+
+class SQLiteConnection:
+    """Stands in for mysql.connector connections; every connect() shares one database"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def cursor(self, dictionary: bool = False, **kwargs):
+        return SQLiteCursor(self.conn, dictionary)
+
+    def commit(self):
+        self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        pass
+
+    def is_connected(self):
+        return True
+
+
+class SQLiteMySQLStub:
+    def __init__(self):
+        self.conn = sqlite3.connect(':memory:', check_same_thread=False)
+        self.conn.execute('PRAGMA foreign_keys = ON')
+        self.conn.executescript(sqlite_schema())
+
+    def connect(self, **kwargs):
+        return SQLiteConnection(self.conn)
+
+    def count(self, table: str) -> int:
+        return self.conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+
+# ---------------------------------------------------------------------------
+# Measurement helpers
+# ---------------------------------------------------------------------------
+
+class StageTimer:
+    """Collects per-stage latencies by wrapping methods on an instance"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.lock = threading.Lock()
+
+    def record(self, stage: str, seconds: float) -> None:
+        with self.lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    def wrap(self, obj: Any, method_name: str, stage: str) -> None:
+        original = getattr(obj, method_name)
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+
+        setattr(obj, method_name, timed)
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {stage: percentiles(values) for stage, values in self.samples.items()}
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds"""
+    if not values:
+        return {'count': 0}
+    ordered = sorted(values)
+
+    def pick(q):
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        'count': len(ordered),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 4),
+        'p50_ms': round(pick(0.50), 4),
+        'p90_ms': round(pick(0.90), 4),
+        'p99_ms': round(pick(0.99), 4),
+        'max_ms': round(ordered[-1] * 1000, 4)
+    }
+
+
+def memory_snapshot() -> Dict[str, Any]:
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    max_rss_mb = usage / 1024 if sys.platform != 'darwin' else usage / (1024 * 1024)
+    snapshot = {'max_rss_mb': round(max_rss_mb, 2)}
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        snapshot['traced_current_mb'] = round(current / (1024 * 1024), 2)
+        snapshot['traced_peak_mb'] = round(peak / (1024 * 1024), 2)
+    return snapshot
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+# ---------------------------------------------------------------------------
+# Environment setup
+# ---------------------------------------------------------------------------
+
+@contextlib.contextmanager
+def stand_in_environment():
+    """Patch mysql.connector.connect to SQLite and yield fake Redis/Mongo handles"""
+    import fakeredis
+    import mongomock
+    import mysql.connector
+
+    mysql_stub = SQLiteMySQLStub()
+    server = fakeredis.FakeServer()
+    original_connect = mysql.connector.connect
+    mysql.connector.connect = mysql_stub.connect
+    try:
+        yield {
+            'mysql': mysql_stub,
+            'redis_factory': lambda decode_responses=True: fakeredis.FakeRedis(
+                server=server, decode_responses=decode_responses),
+            'mongo_client': mongomock.MongoClient()
+        }
+    finally:
+        mysql.connector.connect = original_connect
+
+
+def prepare_real_databases(args) -> None:
+    """Point the data processor at the benchmark databases, creating the MySQL one if needed"""
+    import mysql.connector
+
+    conn = mysql.connector.connect(
+        host=os.getenv('MYSQL_HOST', 'mysql'),
+        user=os.getenv('MYSQL_USER', 'root'),
+        password=os.getenv('MYSQL_PASSWORD', 'example')
+    )
+    cursor = conn.cursor()
+    cursor.execute(f"CREATE DATABASE IF NOT EXISTS `{args.bench_database}`")
+    cursor.close()
+    conn.close()
+    os.environ['MYSQL_DATABASE'] = args.bench_database
+    os.environ['MONGODB_DATABASE'] = args.bench_database
+    os.environ.setdefault('MIGRATIONS_DIR', os.path.join(ROOT, 'database', 'mysql', 'migrations'))
+
+
+def build_processor(processor_module, args, env: Dict[str, Any]):
+    if args.mode == 'real':
+        prepare_real_databases(args)
+        return processor_module.DataProcessor()
+
+    processor = processor_module.DataProcessor.__new__(processor_module.DataProcessor)
+    processor.setup_logging()
+    processor.tracer = None
+    if args.trace_sample_rate:
+        from tracing import FileSpanExporter, Tracer
+        processor.tracer = Tracer(FileSpanExporter(args.trace_file))
+    processor.redis_client = env['redis_factory']()
+    processor.mysql_config = {'database': 'iot_agriculture'}
+    processor.mongo_client = env['mongo_client']
+    processor.mongo_db = processor.mongo_client.iot_agriculture
+    processor.mongo_collection = processor.mongo_db.sensor_logs
+    processor.sensor_registry = processor_module.SensorRegistry(processor.mysql_connect)
+    processor.sensor_registry.load()
+    processor.location_context = processor_module.LocationContextCache(processor.get_weather_condition)
+    return processor
+
+
+def build_simulator(simulator_module, sensors: int, trace_sample_rate: float = 0):
+    simulator = simulator_module.IoTSensorSimulator.__new__(simulator_module.IoTSensorSimulator)
+    simulator.setup_logging()
+    simulator.trace_sample_rate = trace_sample_rate
+    sensor_types = ['temperature', 'humidity', 'ph']
+    simulator.sensors = [
+        {'id': f"{sensor_types[i % 3]}_sensor_{i}", 'type': sensor_types[i % 3], 'location': f"field_{i // 10}"}
+        for i in range(sensors)
+    ]
+    return simulator
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+def bench_pipeline(args, simulator_module, processor_module, env) -> Dict[str, Any]:
+    """Simulator -> Redis list -> DataProcessor, with producer and consumer in separate threads"""
+    timer = StageTimer()
+    simulator = build_simulator(simulator_module, args.sensors, args.trace_sample_rate)
+    processor = build_processor(processor_module, args, env)
+    producer_redis = processor.redis_client if args.mode == 'real' else env['redis_factory']()
+    queue = args.queue
+
+    for method, stage in [('validate_sensor_data', 'validate'), ('enrich_data', 'enrich'),
+                          ('store_in_mysql', 'mysql'), ('store_in_mongodb', 'mongodb'),
+                          ('check_alerts', 'alerts'), ('process_sensor_data', 'process_total')]:
+        timer.wrap(processor, method, stage)
+
+    aggregator = None
+    if args.edge:
+        from edge_aggregator import EdgeAggregator, decode_batch
+        aggregator = EdgeAggregator(flush_interval=0, compression=args.edge_compression)
+
+    generated = forwarded = 0
+    producer_done = threading.Event()
+
+    def enqueue(data):
+        nonlocal forwarded
+        data['bench_enqueued_at'] = time.time()
+        if 'trace_id' in data:
+            data['enqueued_at'] = data['bench_enqueued_at']
+        start = time.perf_counter()
+        producer_redis.rpush(queue, json.dumps(data))
+        timer.record('enqueue', time.perf_counter() - start)
+        forwarded += 1
+
+    def forward_edge_batch():
+        # Readings reach the queue the way the gateway would see them: encoded, then decoded again
+        start = time.perf_counter()
+        batch = aggregator.flush()
+        timer.record('edge_encode_batch', time.perf_counter() - start)
+        start = time.perf_counter()
+        readings = decode_batch(batch['body'], batch['headers'])
+        timer.record('edge_decode_batch', time.perf_counter() - start)
+        if [r['sensor_id'] for r in readings] != [r['sensor_id'] for r in batch['readings']]:
+            raise RuntimeError(f"Edge batch did not round-trip: {len(batch['readings'])} readings in, {len(readings)} out")
+        for data in readings:
+            enqueue(data)
+
+    def produce():
+        nonlocal generated
+        interval = 1.0 / args.rate if args.rate > 0 else 0
+        next_at = time.perf_counter()
+        while generated < args.readings:
+            for sensor in simulator.sensors:
+                if generated >= args.readings:
+                    break
+                start = time.perf_counter()
+                data = simulator.generate_sensor_data(sensor)
+                timer.record('generate', time.perf_counter() - start)
+                generated += 1
+
+                if aggregator:
+                    start = time.perf_counter()
+                    aggregator.add(data)
+                    timer.record('edge_filter', time.perf_counter() - start)
+                else:
+                    enqueue(data)
+
+                if interval:
+                    next_at += interval
+                    delay = next_at - time.perf_counter()
+                    if delay > 0:
+                        time.sleep(delay)
+
+            if aggregator and aggregator.pending:
+                forward_edge_batch()
+        producer_done.set()
+
+    processed = failed = 0
+    started = time.perf_counter()
+    producer = threading.Thread(target=produce, name='bench-producer', daemon=True)
+    producer.start()
+
+    while not (producer_done.is_set() and processed + failed >= forwarded):
+        start = time.perf_counter()
+        result = processor.redis_client.brpop(queue, timeout=1)
+        if not result:
+            continue
+        timer.record('dequeue', time.perf_counter() - start)
+
+        received_at = time.time()
+        _, data_json = result
+        data = json.loads(data_json)
+        enqueued_at = data.pop('bench_enqueued_at')
+        timer.record('queue_wait', max(0.0, received_at - enqueued_at))
+        if processor.process_sensor_data(data, received_at):
+            processed += 1
+        else:
+            failed += 1
+        timer.record('end_to_end', max(0.0, time.time() - enqueued_at))
+
+    elapsed = time.perf_counter() - started
+    producer.join()
+    if processor.tracer:
+        processor.tracer.shutdown()
+
+    result = {
+        'readings': generated,
+        'forwarded': forwarded,
+        'processed': processed,
+        'failed': failed,
+        'elapsed_s': round(elapsed, 4),
+        'throughput_rps': round(processed / elapsed, 2) if elapsed else 0,
+        'stages': timer.summary()
+    }
+    if aggregator:
+        result['edge'] = aggregator.summary()
+    if args.mode == 'stub':
+        result['rows'] = {'sensor_readings': env['mysql'].count('sensor_readings')}
+    return result
+
+
+def bench_cloud_api(args, cloud_module, simulator_module, env) -> Dict[str, Any]:
+    """POST /api/ingest through Flask's test client"""
+    timer = StageTimer()
+    simulator = build_simulator(simulator_module, args.sensors)
+
+    if args.mode == 'stub':
+        mongo_db = env['mongo_client'].iot_agriculture_cloud
+        cloud_redis = env['redis_factory'](decode_responses=False)
+        cloud_module.get_mysql_connection = lambda: env['mysql'].connect()
+        cloud_module.get_mongodb_connection = lambda: mongo_db
+        cloud_module.get_redis_connection = lambda: cloud_redis
+
+    for method, stage in [('store_in_mysql', 'mysql'), ('store_in_mongodb', 'mongodb'),
+                          ('cache_in_redis', 'redis'), ('process_alerts', 'alerts')]:
+        timer.wrap(cloud_module, method, stage)
+
+    client = cloud_module.app.test_client()
+    readings = [simulator.generate_sensor_data(simulator.sensors[i % len(simulator.sensors)])
+                for i in range(args.cloud_requests)]
+
+    errors = 0
+    started = time.perf_counter()
+    for data in readings:
+        start = time.perf_counter()
+        response = client.post('/api/ingest', json=data)
+        timer.record('request', time.perf_counter() - start)
+        if response.status_code != 200:
+            errors += 1
+    elapsed = time.perf_counter() - started
+
+    return {
+        'requests': len(readings),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 4),
+        'throughput_rps': round(len(readings) / elapsed, 2) if elapsed else 0,
+        'stages': timer.summary()
+    }
+
+
+# ---------------------------------------------------------------------------
+# Reporting
+# ---------------------------------------------------------------------------
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Print throughput and p50/p99 deltas against a previous result file"""
+    print(f"\nComparison against {baseline['meta']['commit']} ({baseline['meta']['timestamp']})")
+    for suite, result in current['results'].items():
+        base = baseline['results'].get(suite)
+        if not base:
+            continue
+        print(f"  {suite}: throughput {base['throughput_rps']} -> {result['throughput_rps']} rps"
+              f" ({delta_pct(base['throughput_rps'], result['throughput_rps'])})")
+        for stage, stats in result['stages'].items():
+            base_stats = base['stages'].get(stage)
+            if not base_stats or not stats.get('count') or not base_stats.get('count'):
+                continue
+            print(f"    {stage:<18} p50 {base_stats['p50_ms']:.3f} -> {stats['p50_ms']:.3f} ms"
+                  f" ({delta_pct(base_stats['p50_ms'], stats['p50_ms'])}),"
+                  f" p99 {base_stats['p99_ms']:.3f} -> {stats['p99_ms']:.3f} ms"
+                  f" ({delta_pct(base_stats['p99_ms'], stats['p99_ms'])})")
+
+
+def delta_pct(before: float, after: float) -> str:
+    if not before:
+        return 'n/a'
+    return f"{100 * (after - before) / before:+.1f}%"
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    for suite, result in report['results'].items():
+        print(f"\n{suite}: {result['throughput_rps']} rps over {result['elapsed_s']}s")
+        for stage, stats in result['stages'].items():
+            if stats.get('count'):
+                print(f"  {stage:<18} n={stats['count']:<7} p50={stats['p50_ms']:.3f}ms"
+                      f" p90={stats['p90_ms']:.3f}ms p99={stats['p99_ms']:.3f}ms max={stats['max_ms']:.3f}ms")
+        if 'edge' in result:
+            edge = result['edge']
+            print(f"  edge: {edge['readings_sent']}/{edge['readings_in']} readings sent,"
+                  f" {edge['bytes_saved_pct']}% bytes saved")
+    print(f"\nmemory: {report['memory']}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark the IoT sensor pipeline')
+    parser.add_argument('--mode', choices=['stub', 'real'], default='stub',
+                        help='stub: in-process stand-ins; real: services from environment variables')
+    parser.add_argument('--sensors', type=int, default=50)
+    parser.add_argument('--readings', type=int, default=5000, help='readings pushed through the pipeline')
+    parser.add_argument('--rate', type=float, default=0, help='producer rate in readings/s (0 = unthrottled)')
+    parser.add_argument('--cloud-requests', type=int, default=1000, help='requests sent to the cloud API (0 to skip)')
+    parser.add_argument('--edge', action='store_true', help='run readings through the edge aggregator as well')
+    parser.add_argument('--edge-compression', default='gzip', choices=['gzip', 'zstd', 'none'])
+    parser.add_argument('--trace-sample-rate', type=float, default=0,
+                        help='fraction of readings to trace (stub mode exports spans to --trace-file)')
+    parser.add_argument('--trace-file', default=os.path.join(RESULTS_DIR, 'traces.jsonl'))
+    parser.add_argument('--bench-database', default='iot_agriculture_bench',
+                        help='MySQL/MongoDB database written to in real mode')
+    parser.add_argument('--queue', default=None,
+                        help="Redis list to use (defaults to 'sensor_data' in stub mode and 'bench_sensor_data' in real mode)")
+    parser.add_argument('--trace-memory', action='store_true', help='track Python allocations with tracemalloc (slower)')
+    parser.add_argument('--log-level', default='WARNING')
+    parser.add_argument('--output', help='result file (default: benchmarks/results/<timestamp>-<commit>.json)')
+    parser.add_argument('--compare', help='previous result file to compare against')
+    args = parser.parse_args()
+    if args.queue is None:
+        args.queue = 'sensor_data' if args.mode == 'stub' else 'bench_sensor_data'
+    if args.mode == 'real':
+        if args.bench_database == 'iot_agriculture':
+            parser.error('--bench-database must not be the production database')
+        if args.queue == 'sensor_data':
+            parser.error('--queue must not be the production queue in real mode')
+        # The cloud API writes to its production databases through module-level getters
+        args.cloud_requests = 0
+    return args
+
+
+def main():
+    args = parse_args()
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    if args.trace_memory:
+        tracemalloc.start()
+
+    simulator_module = load_module('sensor_simulator_app', SIMULATOR_DIR)
+    processor_module = load_module('data_processor_app', PROCESSOR_DIR)
+    cloud_module = load_module('cloud_api_app', CLOUD_API_DIR) if args.cloud_requests else None
+    # Services configure logging at INFO on startup; per-reading log lines would dominate timings
+    logging.getLogger().setLevel(args.log_level)
+    for name in ('IoTSensorSimulator', 'DataProcessor', 'EdgeAggregator', 'Tracer', 'cloud_api_app'):
+        logging.getLogger(name).setLevel(args.log_level)
+
+    env_manager = stand_in_environment() if args.mode == 'stub' else contextlib.nullcontext({})
+    with env_manager as env:
+        results = {'pipeline': bench_pipeline(args, simulator_module, processor_module, env)}
+        if cloud_module:
+            results['cloud_api'] = bench_cloud_api(args, cloud_module, simulator_module, env)
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'config': vars(args)
+        },
+        'results': results,
+        'memory': memory_snapshot()
+    }
+    print_report(report)
+
+    output = args.output
+    if not output:
+        output = os.path.join(RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d_%H%M%S')}-{report['meta']['commit']}.json")
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == '__main__':
+    main()
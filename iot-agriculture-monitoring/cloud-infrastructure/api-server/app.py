@@ -3,10 +3,14 @@ from flask import Flask, request, jsonify
 import redis
 import pymongo
 import mysql.connector
+from mysql.connector import errorcode
 import json
 import logging
 from datetime import datetime, timedelta
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 from flask_cors import CORS
 
 app = Flask(__name__)
@@ -16,64 +20,195 @@ CORS(app)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Database connections
-def get_mysql_connection():
+# Database connections; pass a timeout (seconds) to fail fast, e.g. for health probes
+def get_mysql_connection(timeout=None):
+    options = {'connect_timeout': max(1, int(timeout))} if timeout else {}
     return mysql.connector.connect(
         host='localhost',
         user='iot_user',
         password='iot_password_123',
-        database='iot_agriculture'
+        database='iot_agriculture',
+        **options
     )
 
+def get_mongodb_client(timeout=None):
+    options = {}
+    if timeout:
+        options = {
+            'serverSelectionTimeoutMS': int(timeout * 1000),
+            'connectTimeoutMS': int(timeout * 1000),
+            'connect': False
+        }
+    return pymongo.MongoClient('mongodb://localhost:27017/', **options)
+
 def get_mongodb_connection():
-    client = pymongo.MongoClient('mongodb://localhost:27017/')
-    return client.iot_agriculture
+    return get_mongodb_client().iot_agriculture
+
+def get_redis_connection(timeout=None):
+    options = {'socket_timeout': timeout, 'socket_connect_timeout': timeout} if timeout else {}
+    return redis.Redis(host='localhost', port=6379, db=0, **options)
+
+# Health monitoring
+HEALTH_CHECK_INTERVAL = float(os.getenv('HEALTH_CHECK_INTERVAL', '10'))
+HEALTH_CHECK_TIMEOUT = float(os.getenv('HEALTH_CHECK_TIMEOUT', '2'))
+
+class HealthMonitor:
+    """Probes dependencies in the background and keeps the last known status.
+
+    Health endpoints read the cached snapshot, so load balancer polling never
+    touches the databases and a slow dependency cannot stall the response.
+    """
+
+    def __init__(self, interval=HEALTH_CHECK_INTERVAL, timeout=HEALTH_CHECK_TIMEOUT):
+        self.probes = {
+            'mysql': self.check_mysql_health,
+            'mongodb': self.check_mongodb_health,
+            'redis': self.check_redis_health
+        }
+        self.interval = interval
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=len(self.probes), thread_name_prefix='health-probe')
+        self.lock = threading.Lock()
+        self.started = False
+        self.pending = {}
+        self.status = {
+            name: {'status': 'unknown', 'latency_ms': None, 'checked_at': None}
+            for name in self.probes
+        }
+        self.last_cycle = None
+
+        # Long-lived clients so probes reuse connections instead of opening new ones
+        self.mongo_client = get_mongodb_client(timeout)
+        self.redis_client = get_redis_connection(timeout)
+
+    def check_mysql_health(self):
+        try:
+            conn = get_mysql_connection(self.timeout)
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            conn.close()
+            return 'healthy'
+        except Exception as e:
+            logger.error(f"MySQL health check failed: {e}")
+            return 'unhealthy'
+
+    def check_mongodb_health(self):
+        try:
+            self.mongo_client.admin.command('ping')
+            return 'healthy'
+        except Exception as e:
+            logger.error(f"MongoDB health check failed: {e}")
+            return 'unhealthy'
+
+    def check_redis_health(self):
+        try:
+            self.redis_client.ping()
+            return 'healthy'
+        except Exception as e:
+            logger.error(f"Redis health check failed: {e}")
+            return 'unhealthy'
+
+    def start(self):
+        with self.lock:
+            if self.started:
+                return
+            self.started = True
+        thread = threading.Thread(target=self.run, name='health-monitor', daemon=True)
+        thread.start()
+        logger.info(f"Health monitor started (interval={self.interval}s, timeout={self.timeout}s)")
+
+    def run(self):
+        while True:
+            try:
+                self.probe_all()
+            except Exception as e:
+                logger.error(f"Health monitor cycle failed: {e}")
+            time.sleep(self.interval)
+
+    def probe_all(self):
+        started_at = time.monotonic()
+        futures = {}
+        for name, probe in self.probes.items():
+            previous = self.pending.get(name)
+            if previous is not None and not previous.done():
+                # Previous probe is still hanging; don't pile up more threads behind it
+                self.record(name, 'unhealthy', None, error='probe still running')
+                continue
+            futures[name] = (self.executor.submit(self.timed_probe, probe), time.perf_counter())
+            self.pending[name] = futures[name][0]
+
+        for name, (future, submitted_at) in futures.items():
+            remaining = max(0.0, self.timeout - (time.monotonic() - started_at))
+            try:
+                status, latency_ms = future.result(timeout=remaining)
+                self.record(name, status, latency_ms)
+            except FutureTimeoutError:
+                latency_ms = (time.perf_counter() - submitted_at) * 1000
+                logger.error(f"{name} health check timed out after {self.timeout}s")
+                self.record(name, 'unhealthy', round(latency_ms, 2), error='timeout')
+            except Exception as e:
+                logger.error(f"{name} health check raised: {e}")
+                self.record(name, 'unhealthy', None, error=str(e))
+
+        with self.lock:
+            self.last_cycle = time.time()
+
+    @staticmethod
+    def timed_probe(probe):
+        start = time.perf_counter()
+        status = probe()
+        return status, round((time.perf_counter() - start) * 1000, 2)
+
+    def record(self, name, status, latency_ms, error=None):
+        entry = {
+            'status': status,
+            'latency_ms': latency_ms,
+            'checked_at': datetime.now().isoformat()
+        }
+        if error:
+            entry['error'] = error
+        with self.lock:
+            self.status[name] = entry
+
+    def snapshot(self):
+        with self.lock:
+            services = {name: dict(entry) for name, entry in self.status.items()}
+            last_cycle = self.last_cycle
+
+        stale = last_cycle is None or time.time() - last_cycle > 3 * self.interval + self.timeout
+        ready = not stale and all(entry['status'] == 'healthy' for entry in services.values())
+        return {
+            'status': 'healthy' if ready else 'degraded',
+            'ready': ready,
+            'stale': stale,
+            'last_check': datetime.fromtimestamp(last_cycle).isoformat() if last_cycle else None,
+            'services': services
+        }
 
-def get_redis_connection():
-    return redis.Redis(host='localhost', port=6379, db=0)
+health_monitor = HealthMonitor()
 
 @app.route('/health', methods=['GET'])
 def health_check():
+    health_monitor.start()
+    snapshot = health_monitor.snapshot()
+    snapshot['timestamp'] = datetime.now().isoformat()
+    return jsonify(snapshot)
+
+@app.route('/health/live', methods=['GET'])
+def liveness_check():
     return jsonify({
-        'status': 'healthy',
-        'timestamp': datetime.now().isoformat(),
-        'services': {
-            'mysql': check_mysql_health(),
-            'mongodb': check_mongodb_health(),
-            'redis': check_redis_health()
-        }
+        'status': 'alive',
+        'timestamp': datetime.now().isoformat()
     })
 
-def check_mysql_health():
-    try:
-        conn = get_mysql_connection()
-        cursor = conn.cursor()
-        cursor.execute("SELECT 1")
-        cursor.fetchone()
-        cursor.close()
-        conn.close()
-        return 'healthy'
-    except Exception as e:
-        logger.error(f"MySQL health check failed: {e}")
-        return 'unhealthy'
-
-def check_mongodb_health():
-    try:
-        db = get_mongodb_connection()
-        db.command('ping')
-        return 'healthy'
-    except Exception as e:
-        logger.error(f"MongoDB health check failed: {e}")
-        return 'unhealthy'
-
-def check_redis_health():
-    try:
-        r = get_redis_connection()
-        r.ping()
-        return 'healthy'
-    except Exception as e:
-        logger.error(f"Redis health check failed: {e}")
-        return 'unhealthy'
+@app.route('/health/ready', methods=['GET'])
+def readiness_check():
+    health_monitor.start()
+    snapshot = health_monitor.snapshot()
+    snapshot['timestamp'] = datetime.now().isoformat()
+    return jsonify(snapshot), 200 if snapshot['ready'] else 503
 
 @app.route('/api/ingest', methods=['POST'])
 def ingest_sensor_data():
@@ -108,50 +243,182 @@ def ingest_sensor_data():
         logger.error(f"Error ingesting data: {e}")
         return jsonify({'error': 'Internal server error'}), 500
 
-def store_in_mysql(data):
-    conn = get_mysql_connection()
-    cursor = conn.cursor()
-    
-    insert_query = """
-    INSERT INTO sensor_readings 
-    (sensor_id, sensor_type, location, value, timestamp, quality, battery_level)
-    VALUES (%s, %s, %s, %s, %s, %s, %s)
+@app.route('/api/ingest/batch', methods=['POST'])
+def ingest_sensor_data_batch():
+    try:
+        body = request.get_json(silent=True)
+        readings = body.get('readings') if isinstance(body, dict) else None
+        if not isinstance(readings, list):
+            return jsonify({'error': 'Body must be a JSON object with a readings list'}), 400
+        
+        # Validate required fields, keeping the valid readings
+        required_fields = ['sensor_id', 'sensor_type', 'location', 'value', 'timestamp']
+        accepted = []
+        rejected = []
+        for data in readings:
+            if not isinstance(data, dict):
+                rejected.append({'sensor_id': None, 'error': 'Reading must be a JSON object'})
+                continue
+            missing = [field for field in required_fields if field not in data]
+            if missing:
+                rejected.append({'sensor_id': data.get('sensor_id'), 'error': f"Missing required fields: {', '.join(missing)}"})
+            else:
+                accepted.append(data)
+        
+        if accepted:
+            store_batch_in_mysql(accepted)
+            store_batch_in_mongodb(accepted)
+            cache_batch_in_redis(accepted)
+        
+        alerts = []
+        for data in accepted:
+            alerts.extend(process_alerts(data))
+        
+        return jsonify({
+            'success': True,
+            'message': 'Batch ingested successfully',
+            'accepted': len(accepted),
+            'rejected': rejected,
+            'alerts': alerts
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error ingesting batch: {e}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+# Sensor registry cache: sensor_id -> (sensor_ref, sensor_type, location).
+# Only committed registry rows are cached.
+sensor_ref_cache = {}
+
+def is_duplicate_key(error):
+    return error.errno == errorcode.ER_DUP_ENTRY
+
+def get_or_create_dimension(cursor, table, name):
+    cursor.execute(f"SELECT id FROM {table} WHERE name = %s", (name,))
+    row = cursor.fetchone()
+    if row:
+        return row[0]
+    try:
+        cursor.execute(f"INSERT INTO {table} (name) VALUES (%s)", (name,))
+        return cursor.lastrowid
+    except mysql.connector.IntegrityError as e:
+        if not is_duplicate_key(e):
+            raise
+        # Created concurrently by another request
+        cursor.execute(f"SELECT id FROM {table} WHERE name = %s", (name,))
+        return cursor.fetchone()[0]
+
+def resolve_sensor_ref(conn, cursor, data):
+    """Return the sensor_ref for a reading, registering or updating the sensor if needed.
+
+    Registry writes are committed before the result is cached, so a failure
+    later in the batch can't leave the cache pointing at a rolled-back row.
     """
+    cached = sensor_ref_cache.get(data['sensor_id'])
+    if cached and cached[1] == data['sensor_type'] and cached[2] == data['location']:
+        return cached[0]
     
-    cursor.execute(insert_query, (
-        data['sensor_id'],
-        data['sensor_type'],
-        data['location'],
-        data['value'],
-        data['timestamp'],
-        data.get('quality', 'unknown'),
-        data.get('battery_level', 0)
-    ))
+    type_id = get_or_create_dimension(cursor, 'sensor_types', data['sensor_type'])
+    location_id = get_or_create_dimension(cursor, 'locations', data['location'])
+    
+    cursor.execute("SELECT id, type_id, location_id FROM sensors WHERE sensor_key = %s", (data['sensor_id'],))
+    row = cursor.fetchone()
+    if row:
+        sensor_ref = row[0]
+        if (row[1], row[2]) != (type_id, location_id):
+            cursor.execute(
+                "UPDATE sensors SET type_id = %s, location_id = %s WHERE id = %s",
+                (type_id, location_id, sensor_ref)
+            )
+    else:
+        try:
+            cursor.execute(
+                "INSERT INTO sensors (sensor_key, type_id, location_id) VALUES (%s, %s, %s)",
+                (data['sensor_id'], type_id, location_id)
+            )
+            sensor_ref = cursor.lastrowid
+        except mysql.connector.IntegrityError as e:
+            if not is_duplicate_key(e):
+                raise
+            cursor.execute("SELECT id FROM sensors WHERE sensor_key = %s", (data['sensor_id'],))
+            sensor_ref = cursor.fetchone()[0]
     
     conn.commit()
-    cursor.close()
-    conn.close()
+    sensor_ref_cache[data['sensor_id']] = (sensor_ref, data['sensor_type'], data['location'])
+    return sensor_ref
+
+def store_in_mysql(data):
+    store_batch_in_mysql([data])
+
+def store_batch_in_mysql(readings):
+    conn = get_mysql_connection()
+    try:
+        cursor = conn.cursor()
+        
+        rows = [
+            (
+                resolve_sensor_ref(conn, cursor, data),
+                data['value'],
+                data['timestamp'],
+                data.get('quality', 'unknown'),
+                data.get('battery_level', 0)
+            )
+            for data in readings
+        ]
+        
+        insert_query = """
+        INSERT INTO sensor_readings 
+        (sensor_ref, value, timestamp, quality, battery_level)
+        VALUES (%s, %s, %s, %s, %s)
+        """
+        
+        cursor.executemany(insert_query, rows)
+        
+        conn.commit()
+        cursor.close()
+    finally:
+        conn.close()
 
 def store_in_mongodb(data):
+    store_batch_in_mongodb([data])
+
+def store_batch_in_mongodb(readings):
     db = get_mongodb_connection()
     collection = db.sensor_logs
     
-    document = data.copy()
-    document['processed_at'] = datetime.now().isoformat()
+    processed_at = datetime.now().isoformat()
+    documents = [{**data, 'processed_at': processed_at} for data in readings]
     
-    collection.insert_one(document)
+    collection.insert_many(documents)
 
 def cache_in_redis(data):
-    r = get_redis_connection()
+    cache_batch_in_redis([data])
+
+def cache_batch_in_redis(readings):
+    redis_client = get_redis_connection()
+    pipe = redis_client.pipeline(transaction=False)
+    
+    # Edge devices replay spooled readings after an outage, so a batch can be
+    # older than what is already cached. ISO-8601 timestamps sort chronologically.
+    ordered = sorted(readings, key=lambda data: data['timestamp'])
+    newest = {data['sensor_id']: data for data in ordered}
+    sensor_ids = list(newest)
+    cached = redis_client.mget([f"sensor:{sensor_id}:latest" for sensor_id in sensor_ids])
+    
+    for sensor_id, cached_json in zip(sensor_ids, cached):
+        data = newest[sensor_id]
+        if cached_json and json.loads(cached_json).get('timestamp', '') >= data['timestamp']:
+            continue
+        # Cache latest readings by sensor
+        pipe.set(f"sensor:{sensor_id}:latest", json.dumps(data), ex=3600)  # 1 hour expiration
     
-    # Cache latest readings by sensor
-    key = f"sensor:{data['sensor_id']}:latest"
-    r.set(key, json.dumps(data), ex=3600)  # 1 hour expiration
+    for data in ordered:
+        # Cache in time series
+        ts_key = f"sensor:{data['sensor_id']}:timeseries"
+        pipe.lpush(ts_key, json.dumps(data))
+        pipe.ltrim(ts_key, 0, 1000)  # Keep only last 1000 readings
     
-    # Cache in time series
-    ts_key = f"sensor:{data['sensor_id']}:timeseries"
-    r.lpush(ts_key, json.dumps(data))
-    r.ltrim(ts_key, 0, 1000)  # Keep only last 1000 readings
+    pipe.execute()
 
 def process_alerts(data):
     alerts = []
@@ -222,7 +489,7 @@ def store_alert(alert):
     # Store in MongoDB
     db = get_mongodb_connection()
     collection = db.alerts
-    collection.insert_one(alert)
+    collection.insert_one(alert.copy())  # insert_one adds an ObjectId, keep the response serializable
 
 @app.route('/api/sensors', methods=['GET'])
 def get_sensors():
@@ -234,7 +501,7 @@ def get_sensors():
         SELECT DISTINCT sensor_id, sensor_type, location,
                MAX(timestamp) as last_seen,
                COUNT(*) as reading_count
-        FROM sensor_readings 
+        FROM sensor_readings_view 
         WHERE timestamp > DATE_SUB(NOW(), INTERVAL 24 HOUR)
         GROUP BY sensor_id, sensor_type, location
         ORDER BY last_seen DESC
@@ -261,7 +528,7 @@ def get_sensor_data(sensor_id):
         cursor = conn.cursor(dictionary=True)
         
         query = """
-        SELECT * FROM sensor_readings 
+        SELECT * FROM sensor_readings_view 
         WHERE sensor_id = %s 
         AND timestamp > DATE_SUB(NOW(), INTERVAL %s HOUR)
         ORDER BY timestamp DESC
@@ -294,7 +561,7 @@ def get_analytics_summary():
             MIN(value) as min_value,
             MAX(value) as max_value,
             COUNT(*) as reading_count
-        FROM sensor_readings 
+        FROM sensor_readings_view 
         WHERE timestamp > DATE_SUB(NOW(), INTERVAL 24 HOUR)
         GROUP BY sensor_type
         """
@@ -361,4 +628,5 @@ def get_alerts():
         return jsonify({'error': 'Internal server error'}), 500
 
 if __name__ == '__main__':
+    health_monitor.start()
     app.run(host='0.0.0.0', port=3000, debug=False)
\ No newline at end of file
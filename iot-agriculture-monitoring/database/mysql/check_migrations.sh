@@ -0,0 +1,112 @@
+#!/bin/bash
+# database/mysql/check_migrations.sh
+#
+# Applies the migrations to a throwaway MySQL 8 container and checks the result
+# for a fresh database, a database with the pre-registry sensor_readings table,
+# and a migration that was interrupted after the RENAME. Every scenario applies
+# the migrations twice to make sure they are safe to re-run. Requires Docker.
+#
+#   bash database/mysql/check_migrations.sh
+
+set -e
+
+MYSQL_IMAGE="${MYSQL_IMAGE:-mysql:8.0}"
+CONTAINER="iot-migrations-check-$$"
+MIGRATIONS_DIR="$(cd "$(dirname "$0")/migrations" && pwd)"
+
+trap 'docker rm -f "$CONTAINER" >/dev/null 2>&1 || true' EXIT
+
+echo "Starting $MYSQL_IMAGE..."
+docker run -d --name "$CONTAINER" -e MYSQL_ROOT_PASSWORD=check "$MYSQL_IMAGE" >/dev/null
+
+# Connect over TCP: the entrypoint's temporary init server only listens on the socket
+sql() {
+    docker exec -i -e MYSQL_PWD=check "$CONTAINER" mysql -h 127.0.0.1 -u root --batch --skip-column-names "$@"
+}
+
+attempt=0
+until sql -e "SELECT 1" >/dev/null 2>&1; do
+    attempt=$((attempt + 1))
+    if [ $attempt -ge 60 ]; then
+        echo "MySQL did not become ready in time"
+        exit 1
+    fi
+    sleep 2
+done
+
+migrate() {
+    for run in 1 2; do
+        for migration in "$MIGRATIONS_DIR"/*.sql; do
+            sql "$1" < "$migration"
+        done
+    done
+}
+
+expect() {
+    local database="$1" query="$2" expected="$3" actual
+    actual="$(sql "$database" -e "$query")"
+    if [ "$actual" != "$expected" ]; then
+        echo "FAIL [$database] $query"
+        echo "  expected: $expected"
+        echo "  actual:   $actual"
+        exit 1
+    fi
+}
+
+create_legacy_table() {
+    sql "$1" <<'SQL'
+CREATE TABLE sensor_readings (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    sensor_id VARCHAR(50) NOT NULL,
+    sensor_type VARCHAR(50) NOT NULL,
+    location VARCHAR(50) NOT NULL,
+    value FLOAT NOT NULL,
+    timestamp VARCHAR(50) NOT NULL,
+    quality VARCHAR(20),
+    battery_level FLOAT,
+    INDEX(sensor_id),
+    INDEX(sensor_type)
+);
+-- temperature_sensor_1 moved from field_9 to field_1: its latest row must win over MAX(location)
+INSERT INTO sensor_readings (sensor_id, sensor_type, location, value, timestamp, quality, battery_level) VALUES
+    ('temperature_sensor_1', 'temperature', 'field_9', 21.5, '2024-01-01T10:00:00', 'good', 90),
+    ('temperature_sensor_1', 'temperature', 'field_1', 22.0, '2024-01-01T11:00:00', 'good', 89),
+    ('ph_sensor_1', 'ph', 'field_0', 6.8, '2024-01-01T10:00:00', 'fair', 75);
+SQL
+}
+
+check_migrated() {
+    local database="$1"
+    expect "$database" "SELECT COUNT(*) FROM sensor_readings" "3"
+    expect "$database" "SELECT COUNT(*) FROM sensor_readings_legacy" "3"
+    expect "$database" "SELECT COUNT(*) FROM sensor_readings_view" "3"
+    expect "$database" "SELECT COUNT(*) FROM sensors" "2"
+    expect "$database" "SELECT version FROM schema_migrations" "001_sensor_registry"
+    expect "$database" "SELECT location FROM sensor_readings_view WHERE sensor_id = 'temperature_sensor_1' LIMIT 1" "field_1"
+    expect "$database" "SELECT GROUP_CONCAT(value ORDER BY id) FROM sensor_readings_view WHERE sensor_id = 'temperature_sensor_1'" "21.5,22"
+}
+
+echo "Scenario: fresh database"
+sql -e "CREATE DATABASE fresh"
+migrate fresh
+expect fresh "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = 'fresh' AND table_name IN ('sensor_types', 'locations', 'sensors', 'sensor_readings', 'sensor_readings_view', 'schema_migrations')" "6"
+expect fresh "SELECT COUNT(*) FROM information_schema.tables WHERE table_schema = 'fresh' AND table_name = 'sensor_readings_legacy'" "0"
+if sql fresh -e "INSERT INTO sensor_readings (sensor_ref, value, timestamp) VALUES (999, 1, 'orphan')" 2>/dev/null; then
+    echo "FAIL [fresh] reading with an unknown sensor_ref was accepted"
+    exit 1
+fi
+
+echo "Scenario: legacy sensor_readings table"
+sql -e "CREATE DATABASE legacy"
+create_legacy_table legacy
+migrate legacy
+check_migrated legacy
+
+echo "Scenario: migration interrupted after the RENAME"
+sql -e "CREATE DATABASE resumed"
+create_legacy_table resumed
+sql resumed -e "RENAME TABLE sensor_readings TO sensor_readings_legacy"
+migrate resumed
+check_migrated resumed
+
+echo "All migration checks passed"
@@ -0,0 +1,128 @@
+-- Sensor registry schema: sensor metadata lives in small dimension tables and
+-- readings only carry the integer sensor_ref; sensor_readings_view joins it
+-- back for readers. This file is the only definition of these tables: the
+-- MySQL container, the data processor and the cloud deploy all apply it.
+--
+-- It also moves a sensor_readings table from before the sensor registry
+-- (sensor_id, sensor_type and location on every row) onto the new schema.
+--
+-- Safe to re-run and to run from several places (data processor startup,
+-- cloud deploy): every step checks whether it already happened, the readings
+-- copy and its schema_migrations marker commit together, and a named lock
+-- keeps concurrent runs from copying twice. Legacy rows stay in
+-- sensor_readings_legacy.
+
+DO GET_LOCK('migration_001_sensor_registry', 60);
+
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version VARCHAR(50) PRIMARY KEY,
+    applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS sensor_types (
+    id SMALLINT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(50) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS locations (
+    id SMALLINT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(50) NOT NULL UNIQUE
+);
+
+CREATE TABLE IF NOT EXISTS sensors (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    sensor_key VARCHAR(50) NOT NULL UNIQUE,
+    type_id SMALLINT NOT NULL,
+    location_id SMALLINT NOT NULL,
+    updated_at TIMESTAMP(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),
+    FOREIGN KEY (type_id) REFERENCES sensor_types(id),
+    FOREIGN KEY (location_id) REFERENCES locations(id)
+);
+
+-- Move the legacy table aside while it still has the old layout
+SET @migration_sql := (
+    SELECT IF(COUNT(*) > 0, 'RENAME TABLE sensor_readings TO sensor_readings_legacy', 'DO 0')
+    FROM information_schema.columns
+    WHERE table_schema = DATABASE() AND table_name = 'sensor_readings' AND column_name = 'sensor_type'
+);
+PREPARE migration_stmt FROM @migration_sql;
+EXECUTE migration_stmt;
+DEALLOCATE PREPARE migration_stmt;
+
+CREATE TABLE IF NOT EXISTS sensor_readings (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    sensor_ref INT NOT NULL,
+    value FLOAT NOT NULL,
+    timestamp VARCHAR(50) NOT NULL,
+    quality VARCHAR(20),
+    battery_level FLOAT,
+    INDEX(sensor_ref),
+    FOREIGN KEY (sensor_ref) REFERENCES sensors(id)
+);
+
+CREATE OR REPLACE VIEW sensor_readings_view AS
+SELECT r.id, s.sensor_key AS sensor_id, t.name AS sensor_type, l.name AS location,
+       r.value, r.timestamp, r.quality, r.battery_level
+FROM sensor_readings r
+JOIN sensors s ON s.id = r.sensor_ref
+JOIN sensor_types t ON t.id = s.type_id
+JOIN locations l ON l.id = s.location_id;
+
+-- Copy only if a legacy table exists and an earlier run did not finish the copy
+SET @migration_pending := (
+    SELECT COUNT(*) > 0 FROM information_schema.tables
+    WHERE table_schema = DATABASE() AND table_name = 'sensor_readings_legacy'
+) AND NOT EXISTS (
+    SELECT 1 FROM schema_migrations WHERE version = '001_sensor_registry'
+);
+
+SET @migration_sql := IF(@migration_pending,
+    'INSERT IGNORE INTO sensor_types (name) SELECT DISTINCT sensor_type FROM sensor_readings_legacy',
+    'DO 0');
+PREPARE migration_stmt FROM @migration_sql;
+EXECUTE migration_stmt;
+DEALLOCATE PREPARE migration_stmt;
+
+SET @migration_sql := IF(@migration_pending,
+    'INSERT IGNORE INTO locations (name) SELECT DISTINCT location FROM sensor_readings_legacy',
+    'DO 0');
+PREPARE migration_stmt FROM @migration_sql;
+EXECUTE migration_stmt;
+DEALLOCATE PREPARE migration_stmt;
+
+-- A sensor's type and location are taken from its most recent reading
+SET @migration_sql := IF(@migration_pending,
+    'INSERT IGNORE INTO sensors (sensor_key, type_id, location_id)
+     SELECT o.sensor_id, t.id, l.id
+     FROM sensor_readings_legacy o
+     JOIN (SELECT MAX(id) AS id FROM sensor_readings_legacy GROUP BY sensor_id) latest ON latest.id = o.id
+     JOIN sensor_types t ON t.name = o.sensor_type
+     JOIN locations l ON l.name = o.location',
+    'DO 0');
+PREPARE migration_stmt FROM @migration_sql;
+EXECUTE migration_stmt;
+DEALLOCATE PREPARE migration_stmt;
+
+START TRANSACTION;
+
+SET @migration_sql := IF(@migration_pending,
+    'INSERT INTO sensor_readings (sensor_ref, value, timestamp, quality, battery_level)
+     SELECT s.id, o.value, o.timestamp, o.quality, o.battery_level
+     FROM sensor_readings_legacy o
+     JOIN sensors s ON s.sensor_key = o.sensor_id
+     ORDER BY o.id',
+    'DO 0');
+PREPARE migration_stmt FROM @migration_sql;
+EXECUTE migration_stmt;
+DEALLOCATE PREPARE migration_stmt;
+
+SET @migration_sql := IF(@migration_pending,
+    'INSERT INTO schema_migrations (version) VALUES (''001_sensor_registry'')',
+    'DO 0');
+PREPARE migration_stmt FROM @migration_sql;
+EXECUTE migration_stmt;
+DEALLOCATE PREPARE migration_stmt;
+
+COMMIT;
+
+DO RELEASE_LOCK('migration_001_sensor_registry');
@@ -4,6 +4,8 @@ const redis = require('redis');
 const axios = require('axios');
 const cors = require('cors');
 const { MongoClient } = require('mongodb');
+const zlib = require('zlib');
+const msgpack = require('@msgpack/msgpack');
 
 const app = express();
 const port = process.env.PORT || 3000;
@@ -69,7 +71,6 @@ redisClient.on('end', () => {
 
 // Middleware
 app.use(cors());
-app.use(express.json());
 
 // Request logging middleware
 app.use((req, res, next) => {
@@ -77,6 +78,14 @@ app.use((req, res, next) => {
     next();
 });
 
+// Receive batched sensor data from the edge aggregator. Registered before the
+// JSON parser because the body carries its own encoding and compression.
+const rawBatchBody = express.raw({ type: () => true, inflate: false, limit: '10mb' });
+app.post('/api/sensor-data/batch', rawBatchBody, handleSensorDataBatch);
+app.post('/sensor-data/batch', rawBatchBody, handleSensorDataBatch);
+
+app.use(express.json());
+
 // Validate sensor data
 function validateSensorData(data) {
     const required = ['sensor_id', 'sensor_type', 'location', 'value', 'timestamp'];
@@ -197,6 +206,7 @@ async function handleSensorData(req, res) {
         }
 
         // Send directly to data processing queue
+        stampEnqueueTime(sensorData);
         await redisClient.rPush('sensor_data', JSON.stringify(sensorData));
 
         forwardToCloud(sensorData).catch(err => {
@@ -215,6 +225,104 @@ async function handleSensorData(req, res) {
     }
 }
 
+// Record when a traced reading entered the processing queue (epoch seconds)
+function stampEnqueueTime(reading) {
+    if (reading.trace_id) {
+        reading.enqueued_at = Date.now() / 1000;
+    }
+}
+
+// Tracing fields only matter to the local pipeline; keep them out of cloud storage
+function withoutTraceFields(reading) {
+    const { trace_id, trace_start, enqueued_at, ...rest } = reading;
+    return rest;
+}
+
+// Decompress and decode a batch payload into individual readings
+function decodeSensorBatch(body, contentType, contentEncoding) {
+    let payload = body;
+
+    if (contentEncoding === 'gzip') {
+        payload = zlib.gunzipSync(payload);
+    } else if (contentEncoding === 'zstd') {
+        if (typeof zlib.zstdDecompressSync !== 'function') {
+            throw Object.assign(new Error('zstd encoding not supported by this Node.js version'), { status: 415 });
+        }
+        payload = zlib.zstdDecompressSync(payload);
+    } else if (contentEncoding && contentEncoding !== 'identity') {
+        throw Object.assign(new Error(`Unsupported content encoding: ${contentEncoding}`), { status: 415 });
+    }
+
+    const batch = (contentType || '').startsWith('application/msgpack')
+        ? msgpack.decode(payload)
+        : JSON.parse(payload.toString('utf8'));
+
+    const readings = [];
+    for (const group of batch.batches || []) {
+        for (const row of group.rows || []) {
+            const reading = { location: group.location };
+            batch.fields.forEach((field, index) => {
+                if (row[index] !== null && row[index] !== undefined) {
+                    reading[field] = row[index];
+                }
+            });
+            readings.push(reading);
+        }
+    }
+    return readings;
+}
+
+// Handler function for receiving batched sensor data
+async function handleSensorDataBatch(req, res) {
+    try {
+        if (!redisClient.isReady) {
+            console.error('Redis client not ready');
+            return res.status(503).json({ error: 'Service temporarily unavailable' });
+        }
+
+        let readings;
+        try {
+            readings = decodeSensorBatch(req.body, req.get('Content-Type'), req.get('Content-Encoding'));
+        } catch (error) {
+            console.error('Error decoding sensor batch:', error.message);
+            return res.status(error.status || 400).json({ error: error.message });
+        }
+
+        const accepted = [];
+        const rejected = [];
+        for (const reading of readings) {
+            const validation = validateSensorData(reading);
+            if (validation.valid) {
+                accepted.push(reading);
+            } else {
+                rejected.push({ sensor_id: reading.sensor_id, error: validation.error });
+            }
+        }
+
+        if (accepted.length > 0) {
+            accepted.forEach(stampEnqueueTime);
+            await redisClient.rPush('sensor_data', accepted.map(reading => JSON.stringify(reading)));
+        }
+
+        if (accepted.length > 0) {
+            forwardBatchToCloud(accepted).catch(err => {
+                console.error('Background cloud forwarding failed:', err);
+            });
+        }
+
+        res.json({
+            success: true,
+            message: 'Batch received and queued for processing',
+            accepted: accepted.length,
+            rejected
+        });
+
+    } catch (error) {
+        console.error('Error processing sensor batch:', error);
+        res.status(500).json({ error: 'Internal server error' });
+    }
+}
+
 // Get sensor data by ID
 app.get('/api/sensor-data/:sensorId', async (req, res) => {
     try {
@@ -268,7 +376,7 @@ async function forwardToCloud(data) {
     }
 
     try {
-        await axios.post(`${cloudEndpoint}/api/ingest`, data, {
+        await axios.post(`${cloudEndpoint}/api/ingest`, withoutTraceFields(data), {
             timeout: 5000,
             headers: {
                 'Authorization': `Bearer ${vaultSecret}`,
@@ -281,6 +389,29 @@ async function forwardToCloud(data) {
     }
 }
 
+// Forward a whole batch to the cloud in a single request
+async function forwardBatchToCloud(readings) {
+    const cloudEndpoint = process.env.CLOUD_ENDPOINT;
+    const vaultSecret = process.env.OCI_VAULT_SECRET;
+
+    if (!cloudEndpoint || !vaultSecret) {
+        return;
+    }
+
+    try {
+        await axios.post(`${cloudEndpoint}/api/ingest/batch`, { readings: readings.map(withoutTraceFields) }, {
+            timeout: 10000,
+            headers: {
+                'Authorization': `Bearer ${vaultSecret}`,
+                'Content-Type': 'application/json'
+            }
+        });
+        console.log(`Batch of ${readings.length} readings forwarded to cloud successfully`);
+    } catch (error) {
+        console.error('Error forwarding batch to cloud:', error.message);
+    }
+}
+
 // Add diagnostic endpoint
 app.get('/api/diagnostic', async (req, res) => {
     try {
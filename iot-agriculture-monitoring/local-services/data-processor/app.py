@@ -6,14 +6,29 @@ import os
 import mysql.connector
 from datetime import datetime
 import logging
+import signal
+import sys
 import threading
 import time
-from typing import Dict, Any, Optional
+import random
+import re
+from typing import Dict, Any, List, Optional
 import backoff
+from tracing import NOOP_SPAN, create_tracer
+from sensor_registry import LocationContextCache, SensorRegistry
+
+# The MySQL schema is defined only by the SQL files in database/mysql/migrations,
+# which the MySQL container and the cloud deploy apply as well
+def read_sql_statements(path: str) -> List[str]:
+    """Split a migration file into statements (full-line comments, one statement per ';' line end)"""
+    with open(path) as f:
+        lines = [line for line in f.read().splitlines() if not line.lstrip().startswith('--')]
+    return [statement.strip() for statement in re.split(r';\s*$', '\n'.join(lines), flags=re.M) if statement.strip()]
 
 class DataProcessor:
     def __init__(self):
         self.setup_logging()
+        self.setup_tracing()
         self.setup_database_connections()
         
     def setup_logging(self):
@@ -23,6 +38,15 @@ class DataProcessor:
         )
         self.logger = logging.getLogger('DataProcessor')
         
+    def setup_tracing(self):
+        """Enable per-reading tracing when TRACING_ENABLED=true"""
+        self.tracer = create_tracer()
+        if self.tracer:
+            self.logger.info(f"Tracing enabled, exporting spans with {type(self.tracer.exporter).__name__}")
+            
+    def trace_span(self, trace, name: str):
+        return self.tracer.span(trace, name) if trace else NOOP_SPAN
+        
     @backoff.on_exception(backoff.expo, 
                          (redis.ConnectionError, pymongo.errors.ConnectionFailure, mysql.connector.Error),
                          max_tries=5)
@@ -47,12 +71,23 @@ class DataProcessor:
                 'host': os.getenv('MYSQL_HOST', 'mysql'),
                 'user': os.getenv('MYSQL_USER', 'root'),
                 'password': os.getenv('MYSQL_PASSWORD', 'example'),
-                'database': 'iot_agriculture',
+                'database': os.getenv('MYSQL_DATABASE', 'iot_agriculture'),
                 'connect_timeout': 10
             }
             self.test_mysql_connection()
             self.logger.info("Successfully connected to MySQL")
             
+            # Sensor registry and per-location context caches
+            self.sensor_registry = SensorRegistry(
+                self.mysql_connect,
+                refresh_interval=float(os.getenv('SENSOR_REGISTRY_REFRESH_INTERVAL', '60'))
+            )
+            self.sensor_registry.load()
+            self.location_context = LocationContextCache(
+                self.get_weather_condition,
+                ttl=float(os.getenv('LOCATION_CONTEXT_TTL', '300'))
+            )
+            
             # MongoDB connection
             mongo_uri = os.getenv('MONGODB_URI')
             if mongo_uri:
@@ -68,35 +103,24 @@ class DataProcessor:
             self.mongo_client.admin.command('ping')
             self.logger.info("Successfully connected to MongoDB")
             
-            self.mongo_db = self.mongo_client.iot_agriculture
+            self.mongo_db = self.mongo_client[os.getenv('MONGODB_DATABASE', 'iot_agriculture')]
             self.mongo_collection = self.mongo_db.sensor_logs
             
         except Exception as e:
             self.logger.error(f"Failed to setup database connections: {e}")
             raise
             
+    def mysql_connect(self):
+        return mysql.connector.connect(**self.mysql_config)
+        
     def test_mysql_connection(self) -> None:
-        """Test MySQL connection and create table if not exists"""
+        """Test MySQL connection and bring the schema up to date"""
         try:
             conn = mysql.connector.connect(**self.mysql_config)
             cursor = conn.cursor()
             
-            # Create table if not exists
-            create_table_query = """
-            CREATE TABLE IF NOT EXISTS sensor_readings (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                sensor_id VARCHAR(50) NOT NULL,
-                sensor_type VARCHAR(50) NOT NULL,
-                location VARCHAR(50) NOT NULL,
-                value FLOAT NOT NULL,
-                timestamp VARCHAR(50) NOT NULL,
-                quality VARCHAR(20),
-                battery_level FLOAT,
-                INDEX(sensor_id),
-                INDEX(sensor_type)
-            )
-            """
-            cursor.execute(create_table_query)
+            self.run_migrations(cursor)
+            
             conn.commit()
             cursor.close()
             conn.close()
@@ -105,6 +129,17 @@ class DataProcessor:
             self.logger.error(f"MySQL Error: {e}")
             raise
             
+    def run_migrations(self, cursor) -> None:
+        """Run the shared SQL migrations (database/mysql/migrations); each one is safe to re-run"""
+        migrations_dir = os.getenv('MIGRATIONS_DIR', 'migrations')
+        if not os.path.isdir(migrations_dir):
+            raise FileNotFoundError(f"Migrations directory {migrations_dir} not found, set MIGRATIONS_DIR")
+        
+        for name in sorted(f for f in os.listdir(migrations_dir) if f.endswith('.sql')):
+            self.logger.info(f"Applying migration {name}")
+            for statement in read_sql_statements(os.path.join(migrations_dir, name)):
+                cursor.execute(statement)
+            
     def validate_sensor_data(self, data: Dict[str, Any]) -> Optional[str]:
         """Validate sensor data format and values"""
         required_fields = ['sensor_id', 'sensor_type', 'location', 'value', 'timestamp']
@@ -126,47 +161,62 @@ class DataProcessor:
             
         return None
         
-    def process_sensor_data(self, data: Dict[str, Any]) -> bool:
+    def process_sensor_data(self, data: Dict[str, Any], received_at: Optional[float] = None) -> bool:
         """Process and validate sensor data"""
+        trace = self.tracer.start_trace(data, received_at) if self.tracer else None
+        success = False
         try:
             # Data validation
-            validation_error = self.validate_sensor_data(data)
+            with self.trace_span(trace, 'validate'):
+                validation_error = self.validate_sensor_data(data)
             if validation_error:
                 self.logger.error(f"Invalid sensor data: {validation_error}")
                 return False
                 
             # Data enrichment
-            enriched_data = self.enrich_data(data)
+            with self.trace_span(trace, 'enrich'):
+                enriched_data = self.enrich_data(data)
             
             # Store in MySQL
-            self.store_in_mysql(enriched_data)
+            with self.trace_span(trace, 'mysql'):
+                self.store_in_mysql(enriched_data)
             
             # Store in MongoDB
-            self.store_in_mongodb(enriched_data)
+            with self.trace_span(trace, 'mongodb'):
+                self.store_in_mongodb(enriched_data)
             
             # Generate alerts if needed
-            self.check_alerts(enriched_data)
+            with self.trace_span(trace, 'alerts'):
+                self.check_alerts(enriched_data)
             
+            success = True
             return True
             
         except Exception as e:
             self.logger.error(f"Error processing sensor data: {e}", exc_info=True)
             return False
+        finally:
+            if trace:
+                self.tracer.end_trace(trace, {
+                    'sensor.id': data.get('sensor_id', ''),
+                    'sensor.type': data.get('sensor_type', ''),
+                    'sensor.location': data.get('location', '')
+                }, success)
     
     def enrich_data(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Enrich data with additional information"""
         enriched = data.copy()
         enriched['processed_at'] = datetime.now().isoformat()
         enriched['status'] = 'processed'
+        enriched['sensor_ref'] = self.sensor_registry.resolve(data)
         
-        # Add weather correlation (mock)
-        enriched['weather_condition'] = self.get_weather_condition()
+        # Add weather correlation, cached per location
+        enriched['weather_condition'] = self.location_context.get(data['location'])
         
         return enriched
     
-    def get_weather_condition(self) -> str:
+    def get_weather_condition(self, location: str) -> str:
         """Mock weather condition"""
-        import random
         return random.choice(['sunny', 'cloudy', 'rainy'])
     
     @backoff.on_exception(backoff.expo, mysql.connector.Error, max_tries=3)
@@ -178,14 +228,12 @@ class DataProcessor:
             
             insert_query = """
             INSERT INTO sensor_readings 
-            (sensor_id, sensor_type, location, value, timestamp, quality, battery_level)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            (sensor_ref, value, timestamp, quality, battery_level)
+            VALUES (%s, %s, %s, %s, %s)
             """
             
             cursor.execute(insert_query, (
-                data['sensor_id'],
-                data['sensor_type'],
-                data['location'],
+                data['sensor_ref'],
                 data['value'],
                 data['timestamp'],
                 data.get('quality'),
@@ -261,6 +309,14 @@ class DataProcessor:
         """Main processing loop"""
         self.logger.info("Data Processor is running and waiting for sensor data...")
         
+        try:
+            self.process_loop()
+        finally:
+            if self.tracer:
+                self.logger.info("Exporting remaining spans before shutdown")
+                self.tracer.shutdown()
+    
+    def process_loop(self):
         while True:
             try:
                 # Use BRPOP with timeout to avoid busy waiting
@@ -268,6 +324,7 @@ class DataProcessor:
                 result = self.redis_client.brpop('sensor_data', timeout=1)
                 
                 if result:
+                    received_at = time.time()
                     _, data_json = result  # BRPOP returns (key, value)
                     self.logger.info(f"Retrieved data from Redis: {data_json[:100]}...") # Log snippet
                     
@@ -275,7 +332,7 @@ class DataProcessor:
                         data = json.loads(data_json)
                         self.logger.info(f"Processing data from sensor {data.get('sensor_id')}")
                         
-                        if self.process_sensor_data(data):
+                        if self.process_sensor_data(data, received_at):
                             self.logger.info(f"Successfully processed data from sensor {data.get('sensor_id')}")
                         else:
                             self.logger.error(f"Failed to process data from sensor {data.get('sensor_id')}")
@@ -295,5 +352,7 @@ class DataProcessor:
                 time.sleep(5) # Wait before retrying
 
 if __name__ == "__main__":
+    # docker stop sends SIGTERM; exit through run()'s cleanup instead of being killed mid-export
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     processor = DataProcessor()
     processor.run()
\ No newline at end of file
@@ -0,0 +1,172 @@
+# local-services/data-processor/sensor_registry.py
+import logging
+import time
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+import mysql.connector
+from mysql.connector import errorcode
+
+
+class SensorInfo(NamedTuple):
+    sensor_ref: int
+    sensor_type: str
+    location: str
+
+
+class SensorRegistry:
+    """In-process cache of the sensors, sensor_types and locations tables.
+
+    Readings are resolved to their integer ``sensor_ref`` with a dict lookup.
+    Unknown sensors, or sensors whose type or location changed, are written
+    to the registry and the cache is updated in place. Every
+    ``refresh_interval`` seconds a cheap version query detects changes made
+    by other processes and triggers a full reload.
+    """
+
+    def __init__(self, connect: Callable[[], Any], refresh_interval: float = 60):
+        self.logger = logging.getLogger('SensorRegistry')
+        self.connect = connect
+        self.refresh_interval = refresh_interval
+        self.sensors: Dict[str, SensorInfo] = {}
+        self.type_ids: Dict[str, int] = {}
+        self.location_ids: Dict[str, int] = {}
+        self.version: Optional[Tuple[Any, Any]] = None
+        self.last_refresh = 0.0
+
+    def load(self) -> None:
+        """Reload the whole registry from MySQL"""
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id, name FROM sensor_types")
+            type_ids = {name: type_id for type_id, name in cursor.fetchall()}
+            cursor.execute("SELECT id, name FROM locations")
+            location_ids = {name: location_id for location_id, name in cursor.fetchall()}
+            cursor.execute("""
+                SELECT s.id, s.sensor_key, t.name, l.name
+                FROM sensors s
+                JOIN sensor_types t ON t.id = s.type_id
+                JOIN locations l ON l.id = s.location_id
+            """)
+            sensors = {
+                sensor_key: SensorInfo(sensor_ref, sensor_type, location)
+                for sensor_ref, sensor_key, sensor_type, location in cursor.fetchall()
+            }
+            version = self.fetch_version(cursor)
+            cursor.close()
+        finally:
+            conn.close()
+
+        self.type_ids = type_ids
+        self.location_ids = location_ids
+        self.sensors = sensors
+        self.version = version
+        self.last_refresh = time.monotonic()
+        self.logger.info(f"Loaded {len(sensors)} sensors, {len(type_ids)} types and {len(location_ids)} locations")
+
+    @staticmethod
+    def fetch_version(cursor) -> Tuple[Any, Any]:
+        cursor.execute("SELECT COUNT(*), MAX(updated_at) FROM sensors")
+        return tuple(cursor.fetchone())
+
+    def maybe_refresh(self) -> None:
+        """Reload if another process changed the registry since the last check"""
+        now = time.monotonic()
+        if now - self.last_refresh < self.refresh_interval:
+            return
+        self.last_refresh = now
+
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            version = self.fetch_version(cursor)
+            cursor.close()
+        finally:
+            conn.close()
+
+        if version != self.version:
+            self.logger.info("Sensor registry changed, reloading")
+            self.load()
+
+    def resolve(self, data: Dict[str, Any]) -> int:
+        """Return the sensor_ref for a reading, registering or updating the sensor if needed"""
+        self.maybe_refresh()
+
+        info = self.sensors.get(data['sensor_id'])
+        if info is not None and info.sensor_type == data['sensor_type'] and info.location == data['location']:
+            return info.sensor_ref
+        return self.register(data, info)
+
+    def register(self, data: Dict[str, Any], current: Optional[SensorInfo]) -> int:
+        conn = self.connect()
+        try:
+            cursor = conn.cursor()
+            type_id = self.get_or_create(cursor, 'sensor_types', self.type_ids, data['sensor_type'])
+            location_id = self.get_or_create(cursor, 'locations', self.location_ids, data['location'])
+
+            if current is None:
+                sensor_ref = self.insert_sensor(cursor, data['sensor_id'], type_id, location_id)
+                self.logger.info(f"Registered sensor {data['sensor_id']} as {sensor_ref}")
+            else:
+                sensor_ref = current.sensor_ref
+                cursor.execute(
+                    "UPDATE sensors SET type_id = %s, location_id = %s WHERE id = %s",
+                    (type_id, location_id, sensor_ref)
+                )
+                self.logger.info(f"Sensor {data['sensor_id']} moved to {data['sensor_type']}/{data['location']}")
+
+            conn.commit()
+            cursor.close()
+        finally:
+            conn.close()
+
+        # Cache only after the commit so a failed registration can't leave rolled-back ids behind
+        self.type_ids[data['sensor_type']] = type_id
+        self.location_ids[data['location']] = location_id
+        self.sensors[data['sensor_id']] = SensorInfo(sensor_ref, data['sensor_type'], data['location'])
+        return sensor_ref
+
+    def insert_sensor(self, cursor, sensor_key: str, type_id: int, location_id: int) -> int:
+        try:
+            cursor.execute(
+                "INSERT INTO sensors (sensor_key, type_id, location_id) VALUES (%s, %s, %s)",
+                (sensor_key, type_id, location_id)
+            )
+            return cursor.lastrowid
+        except mysql.connector.IntegrityError as e:
+            if e.errno != errorcode.ER_DUP_ENTRY:
+                raise
+            # Registered concurrently by another processor
+            cursor.execute("SELECT id FROM sensors WHERE sensor_key = %s", (sensor_key,))
+            return cursor.fetchone()[0]
+
+    @staticmethod
+    def get_or_create(cursor, table: str, cache: Dict[str, int], name: str) -> int:
+        """Look up a dimension row by name, inserting it if missing; the caller caches it after commit"""
+        if name in cache:
+            return cache[name]
+        try:
+            cursor.execute(f"INSERT INTO {table} (name) VALUES (%s)", (name,))
+            return cursor.lastrowid
+        except mysql.connector.IntegrityError as e:
+            if e.errno != errorcode.ER_DUP_ENTRY:
+                raise
+            cursor.execute(f"SELECT id FROM {table} WHERE name = %s", (name,))
+            return cursor.fetchone()[0]
+
+
+class LocationContextCache:
+    """Per-location context (e.g. weather) refreshed every ``ttl`` seconds instead of per reading"""
+
+    def __init__(self, provider: Callable[[str], Any], ttl: float = 300):
+        self.provider = provider
+        self.ttl = ttl
+        self.entries: Dict[str, Tuple[float, Any]] = {}
+
+    def get(self, location: str) -> Any:
+        now = time.monotonic()
+        entry = self.entries.get(location)
+        if entry is None or now - entry[0] >= self.ttl:
+            entry = (now, self.provider(location))
+            self.entries[location] = entry
+        return entry[1]
@@ -0,0 +1,264 @@
+# local-services/data-processor/tracing.py
+import contextlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import urllib.request
+from typing import Any, Dict, List, Optional
+
+NOOP_SPAN = contextlib.nullcontext()
+
+
+class Trace:
+    """Per-reading trace state: the trace ID and the root span its stages hang off"""
+
+    __slots__ = ('trace_id', 'root_span_id', 'start_ns', 'spans')
+
+    def __init__(self, trace_id: str, start_ns: int):
+        self.trace_id = trace_id
+        self.root_span_id = os.urandom(8).hex()
+        self.start_ns = start_ns
+        self.spans: List[Dict[str, Any]] = []
+
+
+class FileSpanExporter:
+    """Appends spans as JSON lines to a local file"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        with open(self.path, 'a') as f:
+            for span in spans:
+                f.write(json.dumps(span) + '\n')
+
+
+class OTLPHttpSpanExporter:
+    """Posts spans to an OTLP/HTTP collector using the JSON encoding"""
+
+    def __init__(self, endpoint: str, service_name: str, timeout: float = 5):
+        self.url = endpoint.rstrip('/') + '/v1/traces'
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def export(self, spans: List[Dict[str, Any]]) -> None:
+        payload = {
+            'resourceSpans': [{
+                'resource': {'attributes': [otlp_attribute('service.name', self.service_name)]},
+                'scopeSpans': [{
+                    'scope': {'name': 'iot-agriculture'},
+                    'spans': [self.to_otlp(span) for span in spans]
+                }]
+            }]
+        }
+        request = urllib.request.Request(
+            self.url,
+            data=json.dumps(payload).encode('utf-8'),
+            headers={'Content-Type': 'application/json'},
+            method='POST'
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+    @staticmethod
+    def to_otlp(span: Dict[str, Any]) -> Dict[str, Any]:
+        otlp_span = {
+            'traceId': span['trace_id'],
+            'spanId': span['span_id'],
+            'name': span['name'],
+            'kind': 1,
+            'startTimeUnixNano': str(span['start_ns']),
+            'endTimeUnixNano': str(span['end_ns']),
+            'attributes': [otlp_attribute(key, value) for key, value in span['attributes'].items()],
+            'status': {'code': 2, 'message': span['error']} if span.get('error') else {}
+        }
+        if span.get('parent_span_id'):
+            otlp_span['parentSpanId'] = span['parent_span_id']
+        return otlp_span
+
+
+def otlp_attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'key': key, 'value': {'boolValue': value}}
+    if isinstance(value, int):
+        return {'key': key, 'value': {'intValue': str(value)}}
+    if isinstance(value, float):
+        return {'key': key, 'value': {'doubleValue': value}}
+    return {'key': key, 'value': {'stringValue': str(value)}}
+
+
+class Tracer:
+    """Records spans for readings that carry a trace ID and exports them in the background.
+
+    Sampling happens upstream in the simulator, so readings without a
+    ``trace_id`` cost a single dict lookup. Finished spans are queued and
+    exported in batches by a daemon thread; if the exporter falls behind,
+    spans are dropped rather than slowing down processing. Call
+    ``shutdown()`` before exiting so queued and in-flight spans are exported.
+    """
+
+    def __init__(self, exporter, batch_size: int = 512, flush_interval: float = 2,
+                 max_queue_size: int = 10000):
+        self.logger = logging.getLogger('Tracer')
+        self.exporter = exporter
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue: queue.Queue = queue.Queue(maxsize=max_queue_size)
+        self.dropped = 0
+        self.reported_dropped = 0
+        self.stopping = threading.Event()
+        self.exporter_thread = threading.Thread(target=self.export_loop, name='span-exporter', daemon=True)
+        self.exporter_thread.start()
+
+    def start_trace(self, data: Dict[str, Any], received_at: Optional[float] = None) -> Optional[Trace]:
+        """Begin a trace for a sampled reading, recording its time in the queue.
+
+        Sampled readings arrive with ``trace_id`` and ``trace_start`` set by
+        the simulator and ``enqueued_at`` set by the API gateway.
+
+        Strips the upstream timing fields from ``data`` so they are not stored
+        with the reading; ``trace_id`` is kept to correlate stored rows.
+        """
+        trace_id = data.get('trace_id')
+        if not trace_id:
+            return None
+
+        now_ns = time.time_ns()
+        received_ns = int(received_at * 1e9) if received_at else now_ns
+        trace_start = data.pop('trace_start', None)
+        enqueued_at = data.pop('enqueued_at', None)
+        trace = Trace(trace_id, int(trace_start * 1e9) if trace_start else received_ns)
+
+        if enqueued_at:
+            enqueued_ns = int(enqueued_at * 1e9)
+            self.add_span(trace, 'edge_to_queue', trace.start_ns, enqueued_ns)
+            self.add_span(trace, 'queue_wait', enqueued_ns, received_ns)
+        return trace
+
+    @contextlib.contextmanager
+    def _span(self, trace: Trace, name: str, attributes: Optional[Dict[str, Any]] = None):
+        start_ns = time.time_ns()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            self.add_span(trace, name, start_ns, time.time_ns(), attributes, error)
+
+    def span(self, trace: Optional[Trace], name: str, attributes: Optional[Dict[str, Any]] = None):
+        """Context manager timing one processing stage; a no-op for untraced readings"""
+        if trace is None:
+            return NOOP_SPAN
+        return self._span(trace, name, attributes)
+
+    def add_span(self, trace: Trace, name: str, start_ns: int, end_ns: int,
+                 attributes: Optional[Dict[str, Any]] = None, error: Optional[str] = None) -> None:
+        trace.spans.append({
+            'trace_id': trace.trace_id,
+            'span_id': os.urandom(8).hex(),
+            'parent_span_id': trace.root_span_id,
+            'name': name,
+            'start_ns': start_ns,
+            'end_ns': end_ns,
+            'duration_ms': round((end_ns - start_ns) / 1e6, 3),
+            'attributes': attributes or {},
+            'error': error
+        })
+
+    def end_trace(self, trace: Optional[Trace], attributes: Optional[Dict[str, Any]] = None,
+                  success: bool = True) -> None:
+        """Close the root span and hand the trace's spans to the exporter"""
+        if trace is None:
+            return
+        end_ns = time.time_ns()
+        root = {
+            'trace_id': trace.trace_id,
+            'span_id': trace.root_span_id,
+            'parent_span_id': None,
+            'name': 'sensor_reading',
+            'start_ns': trace.start_ns,
+            'end_ns': end_ns,
+            'duration_ms': round((end_ns - trace.start_ns) / 1e6, 3),
+            'attributes': attributes or {},
+            'error': None if success else 'processing failed'
+        }
+        for span in [root] + trace.spans:
+            try:
+                self.queue.put_nowait(span)
+            except queue.Full:
+                self.dropped += 1
+
+    def shutdown(self, timeout: float = 10) -> None:
+        """Stop the exporter thread and export every span still queued"""
+        self.stopping.set()
+        # The exporter thread finishes the batch it is holding before it exits
+        self.exporter_thread.join(timeout)
+        if self.exporter_thread.is_alive():
+            self.logger.warning(f"Span exporter did not stop within {timeout}s")
+
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self.export(batch)
+
+    def export(self, batch: List[Dict[str, Any]]) -> None:
+        try:
+            self.exporter.export(batch)
+        except Exception as e:
+            self.logger.error(f"Error exporting {len(batch)} spans: {e}")
+
+    def export_loop(self) -> None:
+        while not self.stopping.is_set():
+            batch = []
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size and not self.stopping.is_set():
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+
+            if not batch:
+                continue
+            self.export(batch)
+            dropped = self.dropped
+            if dropped > self.reported_dropped:
+                self.logger.warning(
+                    f"Span queue full, dropped {dropped - self.reported_dropped} spans "
+                    f"({dropped} so far)"
+                )
+                self.reported_dropped = dropped
+
+
+def create_tracer(service_name: str = 'data-processor') -> Optional[Tracer]:
+    """Build a tracer from environment variables, or None when tracing is disabled"""
+    if os.getenv('TRACING_ENABLED', 'false').lower() != 'true':
+        return None
+
+    exporter_type = os.getenv('TRACE_EXPORTER', 'file')
+    if exporter_type == 'otlp':
+        exporter = OTLPHttpSpanExporter(
+            os.getenv('OTEL_EXPORTER_OTLP_ENDPOINT', 'http://otel-collector:4318'),
+            service_name
+        )
+    elif exporter_type == 'file':
+        exporter = FileSpanExporter(os.getenv('TRACE_FILE', 'traces.jsonl'))
+    else:
+        raise ValueError(f"Unsupported trace exporter: {exporter_type}")
+
+    return Tracer(
+        exporter,
+        batch_size=int(os.getenv('TRACE_EXPORT_BATCH_SIZE', '512')),
+        flush_interval=float(os.getenv('TRACE_EXPORT_INTERVAL', '2'))
+    )
@@ -7,13 +7,21 @@ import redis
 from datetime import datetime
 import logging
 import os
+import uuid
+from edge_aggregator import EdgeAggregator, encode_readings
+from spool import ReadingSpool
 
 class IoTSensorSimulator:
     def __init__(self):
         self.setup_logging()
         self.setup_redis()
         self.api_gateway_url = os.getenv('API_GATEWAY_URL', 'http://api-gateway:3000')
+        self.trace_sample_rate = float(os.getenv('TRACE_SAMPLE_RATE', '0'))
         self.sensors = self.initialize_sensors()
+        self.edge_aggregator = self.setup_edge_aggregator()
+        self.spool = self.setup_spool()
+        self.gateway_available = True
+        self.rejected_readings = 0
         
     def setup_logging(self):
         logging.basicConfig(
@@ -40,6 +48,52 @@ class IoTSensorSimulator:
             self.logger.error(f"Failed to connect to Redis: {e}")
             raise
     
+    def setup_edge_aggregator(self):
+        if os.getenv('EDGE_AGGREGATION', 'true').lower() != 'true':
+            self.logger.info("Edge aggregation disabled, sending readings individually")
+            return None
+        
+        deadbands = {}
+        for sensor_type in ('temperature', 'humidity', 'ph'):
+            threshold = os.getenv(f'EDGE_DEADBAND_{sensor_type.upper()}')
+            if threshold is not None:
+                deadbands[sensor_type] = float(threshold)
+        
+        # The gateway image (Node 18) has no zstd decoder and answers zstd batches
+        # with 415; only opt in when the gateway runs on Node >= 22.15
+        compression = os.getenv('EDGE_COMPRESSION', 'gzip')
+        if compression == 'zstd' and os.getenv('GATEWAY_SUPPORTS_ZSTD', 'false').lower() != 'true':
+            self.logger.warning("EDGE_COMPRESSION=zstd is not supported by the API Gateway, using gzip "
+                                "(set GATEWAY_SUPPORTS_ZSTD=true if the gateway runs on Node >= 22.15)")
+            compression = 'gzip'
+        
+        aggregator = EdgeAggregator(
+            deadbands=deadbands,
+            heartbeat_interval=float(os.getenv('EDGE_HEARTBEAT_INTERVAL', '60')),
+            flush_interval=float(os.getenv('EDGE_FLUSH_INTERVAL', '5')),
+            compression=compression
+        )
+        self.logger.info(f"Edge aggregation enabled (compression={aggregator.compression}, deadbands={aggregator.deadbands})")
+        return aggregator
+    
+    def setup_spool(self):
+        if os.getenv('SPOOL_ENABLED', 'true').lower() != 'true':
+            self.logger.info("Offline spool disabled, undeliverable readings will be dropped")
+            return None
+        
+        spool = ReadingSpool(
+            directory=os.getenv('SPOOL_DIR', 'spool'),
+            segment_bytes=int(os.getenv('SPOOL_SEGMENT_BYTES', str(4 * 1024 * 1024))),
+            max_bytes=int(os.getenv('SPOOL_MAX_BYTES', str(256 * 1024 * 1024))),
+            fsync_policy=os.getenv('SPOOL_FSYNC', 'interval'),
+            fsync_interval=float(os.getenv('SPOOL_FSYNC_INTERVAL', '1'))
+        )
+        self.spool_drain_batch_size = int(os.getenv('SPOOL_DRAIN_BATCH_SIZE', '500'))
+        self.spool_drain_rate = float(os.getenv('SPOOL_DRAIN_RATE', '1000'))
+        self.spool_drain_budget = float(os.getenv('SPOOL_DRAIN_BUDGET', '3'))
+        self.logger.info(f"Offline spool enabled at {spool.directory} (max {spool.max_bytes} bytes, fsync={spool.fsync_policy})")
+        return spool
+    
     def initialize_sensors(self):
         sensors = [
             {"id": f"temperature_sensor_{i}", "type": "temperature", "location": f"field_{i//10}"} 
@@ -70,6 +124,12 @@ class IoTSensorSimulator:
             "quality": random.choice(["good", "fair", "poor"]),
             "battery_level": random.uniform(20, 100)
         }
+        
+        # Sampled readings carry a trace ID and emission time through the pipeline
+        if self.trace_sample_rate and random.random() < self.trace_sample_rate:
+            data["trace_id"] = uuid.uuid4().hex
+            data["trace_start"] = time.time()
+        
         self.logger.info(f"Generated data for {sensor['id']}: value={data['value']:.2f}")
         return data
     
@@ -92,8 +152,101 @@ class IoTSensorSimulator:
             )
             response.raise_for_status()
             self.logger.info(f"Successfully sent data to API Gateway for sensor {data['sensor_id']}")
+            self.gateway_available = True
         except requests.RequestException as e:
+            if self.is_rejection(e):
+                self.reject_readings([data], e)
+                return
             self.logger.error(f"Error sending to API Gateway: {e}", exc_info=True)
+            self.gateway_available = False
+            self.spool_readings([data])
+    
+    def send_batch_to_api_gateway(self, batch):
+        """Return False only when the batch should be retried later (gateway down or overloaded)"""
+        try:
+            response = requests.post(
+                f"{self.api_gateway_url}/api/sensor-data/batch",
+                data=batch['body'],
+                timeout=10,
+                headers=batch['headers']
+            )
+            response.raise_for_status()
+            self.logger.info(f"Sent batch of {len(batch['readings'])} readings ({len(batch['body'])} bytes) to API Gateway")
+            self.gateway_available = True
+            return True
+        except requests.RequestException as e:
+            if self.is_rejection(e):
+                self.reject_readings(batch['readings'], e)
+                return True
+            self.logger.error(f"Error sending batch to API Gateway: {e}", exc_info=True)
+            self.gateway_available = False
+            return False
+    
+    @staticmethod
+    def is_rejection(error):
+        """A 4xx answer means the gateway is up but will never accept this payload"""
+        response = getattr(error, 'response', None)
+        return (
+            isinstance(error, requests.HTTPError)
+            and response is not None
+            and 400 <= response.status_code < 500
+            and response.status_code not in (408, 429)
+        )
+    
+    def reject_readings(self, readings, error):
+        # Retrying a rejected payload would block the spool forever, so drop it
+        self.gateway_available = True
+        self.rejected_readings += len(readings)
+        self.logger.error(
+            f"API Gateway rejected {len(readings)} readings, dropping them "
+            f"({self.rejected_readings} rejected so far): {error}"
+        )
+    
+    def spool_readings(self, readings):
+        if not self.spool:
+            return
+        try:
+            self.spool.append(readings)
+            self.logger.warning(f"Spooled {len(readings)} readings to disk while API Gateway is unreachable")
+        except OSError as e:
+            self.logger.error(f"Error writing to spool, {len(readings)} readings lost: {e}", exc_info=True)
+    
+    def drain_spool(self):
+        """Replay spooled readings in large batches, throttled to SPOOL_DRAIN_RATE readings/s"""
+        compression = self.edge_aggregator.compression if self.edge_aggregator else 'gzip'
+        deadline = time.monotonic() + self.spool_drain_budget
+        drained = 0
+        
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            readings, token = self.spool.peek(self.spool_drain_batch_size)
+            if not readings:
+                break
+            
+            if not self.send_batch_to_api_gateway(encode_readings(readings, compression)):
+                break
+            self.spool.ack(token, len(readings))
+            drained += len(readings)
+            
+            # Pace catch-up so a large backlog doesn't flood the gateway
+            pause = len(readings) / self.spool_drain_rate - (time.monotonic() - started)
+            if pause > 0:
+                time.sleep(min(pause, max(0, deadline - time.monotonic())))
+        
+        if drained:
+            self.logger.info(f"Drained {drained} spooled readings, {self.spool.total_bytes()} bytes remaining (stats: {self.spool.stats})")
+    
+    def flush_edge_batch(self):
+        batch = self.edge_aggregator.flush()
+        if batch and not self.send_batch_to_api_gateway(batch):
+            self.spool_readings(batch['readings'])
+        
+        stats = self.edge_aggregator.summary()
+        self.logger.info(
+            f"Edge stats: {stats['readings_sent']}/{stats['readings_in']} readings sent, "
+            f"{stats['readings_suppressed']} suppressed, {stats['messages_saved']} messages saved, "
+            f"{stats['payload_bytes']}/{stats['raw_bytes']} bytes ({stats['bytes_saved_pct']}% saved)"
+        )
     
     def run(self):
         self.logger.info("Starting IoT Sensor Simulator...")
@@ -116,10 +269,19 @@ class IoTSensorSimulator:
                         location_data.append(data)
                     
                     for data in location_data:
-                        self.send_to_api_gateway(data)
+                        if self.edge_aggregator:
+                            self.edge_aggregator.add(data)
+                        else:
+                            self.send_to_api_gateway(data)
                     
                     time.sleep(0.1)
                 
+                if self.edge_aggregator and self.edge_aggregator.due():
+                    self.flush_edge_batch()
+                
+                if self.spool and self.gateway_available and self.spool.has_backlog():
+                    self.drain_spool()
+                
                 self.logger.info("Completed one cycle of sensor data generation")
                 time.sleep(5)
                 
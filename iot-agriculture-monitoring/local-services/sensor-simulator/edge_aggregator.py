@@ -0,0 +1,177 @@
+# local-services/sensor-simulator/edge_aggregator.py
+import gzip
+import json
+import logging
+import time
+from typing import Any, Dict, List, Optional
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Column order for batched rows; location is hoisted to the batch level.
+# Trace fields are null for readings that were not sampled.
+BATCH_FIELDS = ['sensor_id', 'sensor_type', 'value', 'timestamp', 'quality', 'battery_level',
+                'trace_id', 'trace_start']
+
+# Minimum change that is worth sending, per sensor type
+DEFAULT_DEADBANDS = {
+    'temperature': 0.5,
+    'humidity': 2.0,
+    'ph': 0.1
+}
+
+
+class EdgeAggregator:
+    """Batches readings per location and drops readings that barely changed.
+
+    A reading is forwarded only when its value moved more than the deadband
+    for its sensor type since the last forwarded value, or when the sensor's
+    heartbeat interval expired. Forwarded readings are grouped by location
+    and encoded as one compact (msgpack or JSON) compressed payload.
+    """
+
+    def __init__(self, deadbands: Optional[Dict[str, float]] = None,
+                 heartbeat_interval: float = 60, flush_interval: float = 5,
+                 compression: str = 'gzip'):
+        self.logger = logging.getLogger('EdgeAggregator')
+        self.deadbands = {**DEFAULT_DEADBANDS, **(deadbands or {})}
+        self.heartbeat_interval = heartbeat_interval
+        self.flush_interval = flush_interval
+        self.compression = compression
+        if compression == 'zstd' and zstandard is None:
+            self.logger.warning("zstandard is not installed, falling back to gzip")
+            self.compression = 'gzip'
+        elif compression not in ('zstd', 'gzip', 'none'):
+            raise ValueError(f"Unsupported compression: {compression}")
+
+        self.last_sent: Dict[str, Dict[str, float]] = {}
+        self.pending: List[Dict[str, Any]] = []
+        self.last_flush = time.monotonic()
+        self.stats = {
+            'readings_in': 0,
+            'readings_sent': 0,
+            'readings_suppressed': 0,
+            'batches_sent': 0,
+            'raw_bytes': 0,
+            'payload_bytes': 0
+        }
+
+    def add(self, data: Dict[str, Any]) -> bool:
+        """Queue a reading for the next batch. Returns False if it was filtered out."""
+        self.stats['readings_in'] += 1
+        self.stats['raw_bytes'] += len(json.dumps(data))
+
+        now = time.monotonic()
+        previous = self.last_sent.get(data['sensor_id'])
+        if previous is not None:
+            deadband = self.deadbands.get(data['sensor_type'], 0)
+            changed = abs(data['value'] - previous['value']) > deadband
+            heartbeat_due = now - previous['sent_at'] >= self.heartbeat_interval
+            if not changed and not heartbeat_due:
+                self.stats['readings_suppressed'] += 1
+                return False
+
+        self.last_sent[data['sensor_id']] = {'value': data['value'], 'sent_at': now}
+        self.pending.append(data)
+        return True
+
+    def due(self) -> bool:
+        return time.monotonic() - self.last_flush >= self.flush_interval
+
+    def flush(self) -> Optional[Dict[str, Any]]:
+        """Encode pending readings into one payload.
+
+        Returns the dict built by ``encode_readings``, or None if nothing is
+        pending.
+        """
+        self.last_flush = time.monotonic()
+        if not self.pending:
+            return None
+
+        batch = encode_readings(self.pending, self.compression)
+        self.pending = []
+
+        self.stats['readings_sent'] += len(batch['readings'])
+        self.stats['batches_sent'] += 1
+        self.stats['payload_bytes'] += len(batch['body'])
+        return batch
+
+    def summary(self) -> Dict[str, Any]:
+        """Stats plus derived savings compared to one JSON request per reading"""
+        stats = dict(self.stats)
+        raw = stats['raw_bytes']
+        stats['bytes_saved'] = raw - stats['payload_bytes']
+        stats['bytes_saved_pct'] = round(100 * stats['bytes_saved'] / raw, 1) if raw else 0.0
+        stats['messages_saved'] = stats['readings_in'] - stats['batches_sent']
+        return stats
+
+
+def encode_readings(readings: List[Dict[str, Any]], compression: str = 'gzip') -> Dict[str, Any]:
+    """Group readings by location and encode them as one payload.
+
+    Returns a dict with the encoded ``body``, the HTTP ``headers`` to send it
+    with and the source ``readings``, so a failed upload can be spooled.
+    """
+    groups: Dict[str, List[List[Any]]] = {}
+    for reading in readings:
+        row = [reading.get(field) for field in BATCH_FIELDS]
+        groups.setdefault(reading['location'], []).append(row)
+
+    batch = {
+        'v': 1,
+        'fields': BATCH_FIELDS,
+        'batches': [
+            {'location': location, 'rows': rows}
+            for location, rows in groups.items()
+        ]
+    }
+    body, headers = encode_batch(batch, compression)
+    return {'body': body, 'headers': headers, 'readings': readings}
+
+
+def encode_batch(batch: Dict[str, Any], compression: str = 'gzip'):
+    """Serialize and compress a batch, returning (body, headers)"""
+    if msgpack is not None:
+        body = msgpack.packb(batch, use_bin_type=True)
+        content_type = 'application/msgpack'
+    else:
+        body = json.dumps(batch, separators=(',', ':')).encode('utf-8')
+        content_type = 'application/json'
+
+    headers = {'Content-Type': content_type}
+    if compression == 'zstd':
+        body = zstandard.ZstdCompressor(level=3).compress(body)
+        headers['Content-Encoding'] = 'zstd'
+    elif compression == 'gzip':
+        body = gzip.compress(body, compresslevel=6)
+        headers['Content-Encoding'] = 'gzip'
+    return body, headers
+
+
+def decode_batch(body: bytes, headers: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Inverse of encode_batch: expand a payload back into individual readings"""
+    encoding = headers.get('Content-Encoding', 'identity')
+    if encoding == 'zstd':
+        body = zstandard.ZstdDecompressor().decompress(body)
+    elif encoding == 'gzip':
+        body = gzip.decompress(body)
+
+    if headers.get('Content-Type') == 'application/msgpack':
+        batch = msgpack.unpackb(body, raw=False)
+    else:
+        batch = json.loads(body)
+
+    readings = []
+    for group in batch['batches']:
+        for row in group['rows']:
+            reading = {field: value for field, value in zip(batch['fields'], row) if value is not None}
+            reading['location'] = group['location']
+            readings.append(reading)
+    return readings
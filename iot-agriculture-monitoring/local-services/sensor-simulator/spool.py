@@ -0,0 +1,204 @@
+# local-services/sensor-simulator/spool.py
+import json
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+# Each record is framed as: payload length (4 bytes) + crc32 (4 bytes) + JSON payload
+FRAME_HEADER = struct.Struct('>II')
+SEGMENT_SUFFIX = '.seg'
+
+
+class ReadingSpool:
+    """Disk-backed append-only buffer for readings that could not be delivered.
+
+    Readings are appended to numbered segment files. Once a segment reaches
+    ``segment_bytes`` it is sealed and a new one is started. When the spool
+    grows past ``max_bytes`` the oldest segments are evicted first. Draining
+    reads records from the oldest segment and deletes it once every record
+    in it has been acknowledged, so delivery is at-least-once across restarts.
+
+    ``fsync_policy`` is one of ``always`` (fsync after every append),
+    ``interval`` (at most once every ``fsync_interval`` seconds) or ``never``
+    (leave it to the OS).
+    """
+
+    def __init__(self, directory: str, segment_bytes: int = 4 * 1024 * 1024,
+                 max_bytes: int = 256 * 1024 * 1024, fsync_policy: str = 'interval',
+                 fsync_interval: float = 1.0):
+        if fsync_policy not in ('always', 'interval', 'never'):
+            raise ValueError(f"Unsupported fsync policy: {fsync_policy}")
+        if max_bytes < segment_bytes:
+            raise ValueError("max_bytes must be at least segment_bytes")
+
+        self.logger = logging.getLogger('ReadingSpool')
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.max_bytes = max_bytes
+        self.fsync_policy = fsync_policy
+        self.fsync_interval = fsync_interval
+        self.lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self.segments: Dict[int, int] = {}
+        for name in os.listdir(directory):
+            if name.endswith(SEGMENT_SUFFIX):
+                seq = int(name[:-len(SEGMENT_SUFFIX)])
+                self.segments[seq] = os.path.getsize(self.segment_path(seq))
+
+        self.active_seq = max(self.segments, default=0) + 1
+        self.active_file = None
+        self.last_fsync = time.monotonic()
+
+        # Read position inside the oldest segment
+        self.read_seq: Optional[int] = None
+        self.read_offset = 0
+
+        self.stats = {
+            'spooled': 0,
+            'drained': 0,
+            'evicted': 0,
+            'corrupt': 0
+        }
+        if self.segments:
+            self.logger.info(f"Recovered {len(self.segments)} spool segments ({self.total_bytes()} bytes) from {directory}")
+
+    def segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{seq:020d}{SEGMENT_SUFFIX}")
+
+    def total_bytes(self) -> int:
+        return sum(self.segments.values())
+
+    def has_backlog(self) -> bool:
+        with self.lock:
+            return self.total_bytes() > 0
+
+    def append(self, readings: List[Dict[str, Any]]) -> None:
+        """Durably append readings to the active segment"""
+        if not readings:
+            return
+
+        frames = bytearray()
+        for reading in readings:
+            payload = json.dumps(reading, separators=(',', ':')).encode('utf-8')
+            frames += FRAME_HEADER.pack(len(payload), zlib.crc32(payload))
+            frames += payload
+
+        with self.lock:
+            if self.active_file is None:
+                self.active_file = open(self.segment_path(self.active_seq), 'ab')
+                self.segments.setdefault(self.active_seq, 0)
+
+            self.active_file.write(frames)
+            self.active_file.flush()
+            self.segments[self.active_seq] += len(frames)
+            self.stats['spooled'] += len(readings)
+
+            now = time.monotonic()
+            if self.fsync_policy == 'always' or (
+                    self.fsync_policy == 'interval' and now - self.last_fsync >= self.fsync_interval):
+                os.fsync(self.active_file.fileno())
+                self.last_fsync = now
+
+            if self.segments[self.active_seq] >= self.segment_bytes:
+                self.seal_active()
+
+            self.enforce_limit()
+
+    def seal_active(self) -> None:
+        """Close the active segment so it becomes readable; caller holds the lock"""
+        if self.active_file is not None:
+            if self.fsync_policy != 'never':
+                os.fsync(self.active_file.fileno())
+            self.active_file.close()
+            self.active_file = None
+        self.active_seq += 1
+
+    def enforce_limit(self) -> None:
+        """Evict the oldest sealed segments while over max_bytes; caller holds the lock"""
+        while self.total_bytes() > self.max_bytes:
+            sealed = [seq for seq in self.segments if seq != self.active_seq]
+            if not sealed:
+                break
+            oldest = min(sealed)
+            size = self.segments.pop(oldest)
+            evicted = self.count_records(oldest)
+            os.remove(self.segment_path(oldest))
+            if self.read_seq == oldest:
+                self.read_seq = None
+                self.read_offset = 0
+            self.stats['evicted'] += evicted
+            self.logger.warning(f"Spool over {self.max_bytes} bytes, evicted segment {oldest} ({size} bytes, {evicted} readings)")
+
+    def count_records(self, seq: int) -> int:
+        records, _ = self.read_frames(seq, 0, None)
+        return len(records)
+
+    def read_frames(self, seq: int, offset: int, limit: Optional[int]) -> Tuple[List[Dict[str, Any]], int]:
+        """Read up to ``limit`` records starting at ``offset``, stopping at a torn or corrupt frame"""
+        records = []
+        with open(self.segment_path(seq), 'rb') as f:
+            f.seek(offset)
+            while limit is None or len(records) < limit:
+                header = f.read(FRAME_HEADER.size)
+                if len(header) < FRAME_HEADER.size:
+                    break
+                length, checksum = FRAME_HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != checksum:
+                    self.stats['corrupt'] += 1
+                    self.logger.error(f"Corrupt record in spool segment {seq} at offset {offset}, skipping rest of segment")
+                    offset = self.segments.get(seq, offset)
+                    break
+                records.append(json.loads(payload))
+                offset += FRAME_HEADER.size + length
+        return records, offset
+
+    def peek(self, max_records: int) -> Tuple[List[Dict[str, Any]], Optional[Tuple[int, int]]]:
+        """Return the next records to drain and a token to pass to ``ack`` once delivered"""
+        with self.lock:
+            while self.segments:
+                oldest = min(self.segments)
+                if oldest == self.active_seq:
+                    # Only the active segment holds data; seal it so it can be drained
+                    self.seal_active()
+
+                if self.read_seq != oldest:
+                    self.read_seq = oldest
+                    self.read_offset = 0
+
+                records, next_offset = self.read_frames(oldest, self.read_offset, max_records)
+                if records:
+                    return records, (oldest, next_offset)
+
+                # Nothing readable left in this segment (empty or corrupt tail)
+                os.remove(self.segment_path(oldest))
+                del self.segments[oldest]
+                self.read_seq = None
+                self.read_offset = 0
+
+            return [], None
+
+    def ack(self, token: Tuple[int, int], count: int) -> None:
+        """Mark records returned by ``peek`` as delivered"""
+        seq, next_offset = token
+        with self.lock:
+            if seq not in self.segments:
+                return  # evicted while the batch was in flight
+            self.read_seq = seq
+            self.read_offset = next_offset
+            self.stats['drained'] += count
+            if next_offset >= self.segments[seq]:
+                os.remove(self.segment_path(seq))
+                del self.segments[seq]
+                self.read_seq = None
+                self.read_offset = 0
+
+    def close(self) -> None:
+        with self.lock:
+            if self.active_file is not None:
+                self.seal_active()